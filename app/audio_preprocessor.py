@@ -12,7 +12,7 @@ Zawiera funkcje do:
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 import numpy as np
 
 try:
@@ -123,43 +123,7 @@ class AudioPreprocessor:
             
             logger.debug(f"Wczytano audio: {len(audio)}ms, {audio.frame_rate}Hz, {audio.channels} kanałów, {original_dbfs:.1f}dBFS")
             
-            # 1. High-pass filter (EQ - usunięcie niskich częstotliwości) - NAJPIERW
-            if self.eq:
-                logger.info(f"Stosowanie EQ (high-pass {self.highpass}Hz, low-pass 8000Hz)...")
-                audio = high_pass_filter(audio, cutoff=self.highpass)
-                if audio.frame_rate > 16000:
-                    audio = low_pass_filter(audio, cutoff=8000)
-            
-            # 2. Odszumianie (używa noisereduce przez numpy)
-            if self.noise_reduce and NOISE_REDUCE_AVAILABLE:
-                logger.info(f"Stosowanie odszumiania (siła: {self.noise_strength:.0%})...")
-                audio = self._apply_noise_reduction(audio)
-            
-            # 3. Wyrównywanie głośności mówców (PRZED kompresorem)
-            if self.speaker_leveling:
-                logger.info("Wyrównywanie głośności mówców...")
-                audio = self._apply_speaker_leveling(audio)
-            
-            # 4. Kompresor dynamiki
-            if self.compressor:
-                logger.info(f"Stosowanie kompresora (próg: {self.comp_threshold}dB, ratio: {self.comp_ratio}:1)...")
-                audio = compress_dynamic_range(
-                    audio,
-                    threshold=self.comp_threshold,
-                    ratio=self.comp_ratio,
-                    attack=5.0,
-                    release=50.0
-                )
-            
-            # 5. Normalizacja głośności
-            if self.normalize:
-                logger.info("Stosowanie normalizacji...")
-                audio = normalize(audio, headroom=0.5)  # Normalizuj do -0.5dBFS
-            
-            # 6. Podbicie głośności (gain) - NA KOŃCU
-            if self.gain_db != 0:
-                logger.info(f"Stosowanie gain: {self.gain_db}dB...")
-                audio = audio + self.gain_db
+            audio = self._apply_effects(audio)
             
             # Zapisanie przetworzonego pliku
             audio.export(str(output_path), format="wav")
@@ -173,6 +137,72 @@ class AudioPreprocessor:
             logger.error(f"Błąd podczas preprocessing audio {input_path.name}: {e}", exc_info=True)
             return input_path  # Zwróć oryginalny plik w przypadku błędu
     
+    def _apply_effects(self, audio: AudioSegment) -> AudioSegment:
+        """Stosuje włączone efekty w ustalonej kolejności (EQ -> ... -> gain)."""
+        # 1. High-pass filter (EQ - usunięcie niskich częstotliwości) - NAJPIERW
+        if self.eq:
+            logger.info(f"Stosowanie EQ (high-pass {self.highpass}Hz, low-pass 8000Hz)...")
+            audio = high_pass_filter(audio, cutoff=self.highpass)
+            if audio.frame_rate > 16000:
+                audio = low_pass_filter(audio, cutoff=8000)
+        
+        # 2. Odszumianie (używa noisereduce przez numpy)
+        if self.noise_reduce and NOISE_REDUCE_AVAILABLE:
+            logger.info(f"Stosowanie odszumiania (siła: {self.noise_strength:.0%})...")
+            audio = self._apply_noise_reduction(audio)
+        
+        # 3. Wyrównywanie głośności mówców (PRZED kompresorem)
+        if self.speaker_leveling:
+            logger.info("Wyrównywanie głośności mówców...")
+            audio = self._apply_speaker_leveling(audio)
+        
+        # 4. Kompresor dynamiki
+        if self.compressor:
+            logger.info(f"Stosowanie kompresora (próg: {self.comp_threshold}dB, ratio: {self.comp_ratio}:1)...")
+            audio = compress_dynamic_range(
+                audio,
+                threshold=self.comp_threshold,
+                ratio=self.comp_ratio,
+                attack=5.0,
+                release=50.0
+            )
+        
+        # 5. Normalizacja głośności
+        if self.normalize:
+            logger.info("Stosowanie normalizacji...")
+            audio = normalize(audio, headroom=0.5)  # Normalizuj do -0.5dBFS
+        
+        # 6. Podbicie głośności (gain) - NA KOŃCU
+        if self.gain_db != 0:
+            logger.info(f"Stosowanie gain: {self.gain_db}dB...")
+            audio = audio + self.gain_db
+        
+        return audio
+    
+    def process_array(self, samples: np.ndarray, frame_rate: int) -> Optional[np.ndarray]:
+        """
+        Przetwarza próbki mono int16 w pamięci (bez plików pośrednich).
+        
+        Returns:
+            Przetworzone próbki int16 lub None, gdy preprocessing jest wyłączony,
+            niedostępny albo zakończył się błędem
+        """
+        if not self.enabled or not PYDUB_AVAILABLE:
+            return None
+        
+        try:
+            audio = AudioSegment(
+                data=np.ascontiguousarray(samples, dtype=np.int16).tobytes(),
+                sample_width=2,
+                frame_rate=frame_rate,
+                channels=1,
+            )
+            audio = self._apply_effects(audio)
+            return np.frombuffer(audio.raw_data, dtype=np.int16)
+        except Exception as e:
+            logger.error(f"Błąd podczas preprocessing audio (w pamięci): {e}", exc_info=True)
+            return None
+    
     def _apply_noise_reduction(self, audio: AudioSegment) -> AudioSegment:
         """Stosuje odszumianie używając biblioteki noisereduce"""
         try:
@@ -223,40 +253,55 @@ class AudioPreprocessor:
         następnie składa z powrotem z płynnymi przejściami.
         """
         try:
-            # Podziel audio na segmenty po 2 sekundy
+            # Operacje na całej tablicy w numpy (zwalniają GIL) zamiast pętli po segmentach pydub
             segment_length_ms = 2000
-            segments = []
-            
-            for i in range(0, len(audio), segment_length_ms):
-                segment = audio[i:i + segment_length_ms]
-                if len(segment) > 100:  # Minimalny segment
-                    # Sprawdź głośność segmentu
-                    if segment.dBFS > -50:  # Nie jest ciszą
-                        # Normalizuj do docelowej głośności
-                        target_dbfs = -18.0  # Docelowa głośność
-                        change = target_dbfs - segment.dBFS
-                        # Ogranicz zmianę do ±15dB aby uniknąć artefaktów
-                        change = max(-15, min(15, change))
-                        segment = segment + change
-                    segments.append(segment)
-                else:
-                    segments.append(segment)
+            crossfade_ms = min(50, segment_length_ms // 4)
+            target_dbfs = -18.0  # Docelowa głośność
             
-            if not segments:
+            samples = np.array(audio.get_array_of_samples())
+            if samples.size == 0:
                 return audio
+            sample_dtype = samples.dtype
+            channels = audio.channels
+            frames = samples.reshape(-1, channels).astype(np.float64)
+            frame_count = frames.shape[0]
             
-            # Złóż segmenty z crossfade dla płynnych przejść
-            result = segments[0]
-            crossfade_ms = min(50, segment_length_ms // 4)
+            # Podział na segmenty po 2 sekundy (ostatni może być krótszy)
+            block = max(1, int(audio.frame_rate * segment_length_ms / 1000))
+            block_count = -(-frame_count // block)
+            padded = np.zeros((block_count * block, channels))
+            padded[:frame_count] = frames
+            block_lengths = np.full(block_count, block)
+            block_lengths[-1] = frame_count - block * (block_count - 1)
             
-            for segment in segments[1:]:
-                if len(segment) > crossfade_ms and len(result) > crossfade_ms:
-                    result = result.append(segment, crossfade=crossfade_ms)
-                else:
-                    result = result + segment
+            # Głośność segmentu (dBFS jak w pydub)
+            max_amplitude = float(1 << (8 * audio.sample_width - 1))
+            sum_squares = (padded.reshape(block_count, -1) ** 2).sum(axis=1)
+            rms = np.sqrt(sum_squares / (block_lengths * channels))
+            with np.errstate(divide="ignore"):
+                dbfs = 20.0 * np.log10(rms / max_amplitude)
             
-            logger.debug(f"Speaker leveling: {len(segments)} segmentów przetworzonych")
-            return result
+            # Normalizuj segmenty, które nie są ciszą; zmiana ograniczona do ±15dB,
+            # segmenty krótsze niż 100 ms pozostają bez zmian
+            min_block = audio.frame_rate * 100 / 1000
+            change_db = np.where(
+                (dbfs > -50) & (block_lengths > min_block),
+                np.clip(target_dbfs - dbfs, -15, 15),
+                0.0,
+            )
+            gains = np.repeat(10.0 ** (change_db / 20.0), block)[:frame_count]
+            
+            # Płynne przejścia między segmentami (liniowa rampa o długości crossfade)
+            ramp = max(1, int(audio.frame_rate * crossfade_ms / 1000))
+            if ramp > 1 and frame_count > ramp:
+                edge = np.pad(gains, (ramp // 2, ramp - 1 - ramp // 2), mode="edge")
+                gains = np.convolve(edge, np.full(ramp, 1.0 / ramp), mode="valid")
+            
+            info = np.iinfo(sample_dtype)
+            leveled = np.clip(frames * gains[:, None], info.min, info.max).astype(sample_dtype)
+            
+            logger.debug(f"Speaker leveling: {block_count} segmentów przetworzonych")
+            return audio._spawn(leveled.tobytes())
             
         except Exception as e:
             logger.warning(f"Błąd podczas wyrównywania głośności: {e}, kontynuuję bez zmian")
@@ -266,3 +311,32 @@ class AudioPreprocessor:
         """Generuje ścieżkę do pliku wyjściowego z dopiskiem '_processed'"""
         return input_path.parent / f"{input_path.stem}_processed.wav"
 
+
+def preprocess_pcm(
+    pcm: bytes,
+    frame_rate: int,
+    output_path: str,
+    options: Dict[str, Any],
+    fallback_path: Optional[str] = None,
+) -> bool:
+    """Przetwarza próbki PCM s16le mono i zapisuje wynik jako WAV (wywoływane w puli procesów).
+
+    Zwraca False, jeśli przetworzenie nie było możliwe - wtedy nieprzetworzone
+    próbki trafiają do ``fallback_path`` (o ile podano).
+    """
+    import wave
+
+    processed = AudioPreprocessor(**options).process_array(np.frombuffer(pcm, dtype=np.int16), frame_rate)
+    if processed is None:
+        if fallback_path is None:
+            return False
+        target, data = fallback_path, pcm
+    else:
+        target, data = output_path, processed.tobytes()
+    with wave.open(target, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        wav.writeframes(data)
+    return processed is not None
+
@@ -31,7 +31,7 @@ from .content_analyzer import ContentAnalyzer
 from .result_saver import ResultSaver
 from .processing_queue import ProcessingQueue
 from .audio_preprocessor import AudioPreprocessor
-from .config import PROMPT_DIR, OLLAMA_BASE_URL, OLLAMA_MODEL
+from .config import STATUS_PROMPT_FILE, OLLAMA_BASE_URL, OLLAMA_MODEL
 from .ollama_analyzer import OllamaAnalyzer
 
 logger = logging.getLogger(__name__)
@@ -79,18 +79,22 @@ class AudioProcessor:
         try:
             from .config import WHISPER_MODEL, OLLAMA_MODEL
             
-            # Ładowanie modelu Whisper
-            model_to_load = whisper_model if whisper_model else WHISPER_MODEL
-            self.transcriber.load_model(model_to_load)
-            
-            # Inicjalizacja rozpoznawania mówców
+            # Inicjalizacja rozpoznawania mówców w tle - równolegle z ładowaniem Whisper
+            diarization_future = None
             if self.enable_speaker_diarization:
                 self.use_simple_diarization = False
                 from .config import SPEAKER_DIARIZATION_MODEL
-                success = self.speaker_diarizer.initialize(
+                diarization_future = self.speaker_diarizer.initialize_async(
                     speaker_auth_token, 
                     model_name=SPEAKER_DIARIZATION_MODEL
                 )
+            
+            # Ładowanie modelu Whisper
+            model_to_load = whisper_model if whisper_model else WHISPER_MODEL
+            self.transcriber.load_model(model_to_load)
+            
+            if diarization_future is not None:
+                success = diarization_future.result()
                 if not success:
                     logger.warning(
                         "Zaawansowane rozpoznawanie mówców niedostępne – "
@@ -332,7 +336,7 @@ class AudioProcessor:
         """Uruchamia prompt statusu i zwraca wynik."""
         try:
             # Sprawdź czy istnieje plik promptu statusu
-            status_prompt_file = PROMPT_DIR / "status_prompt.txt"
+            status_prompt_file = STATUS_PROMPT_FILE
             if not status_prompt_file.exists():
                 return None
             
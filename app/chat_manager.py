@@ -91,6 +91,10 @@ class ChatConversation:
     created_at: datetime = field(default_factory=_utcnow)
     updated_at: datetime = field(default_factory=_utcnow)
     messages: List[ChatMessage] = field(default_factory=list)
+    # Kontekst (tokeny) zwrócony przez Ollama po ostatniej odpowiedzi - pozwala
+    # wysyłać transkrypcję tylko raz na konwersację. Trzymany wyłącznie w pamięci.
+    model_context: List[int] = field(default_factory=list, repr=False)
+    model_context_model: str = ""
 
     def to_dict(self) -> Dict:
         return {
@@ -232,6 +236,15 @@ class ChatManager:
             self._save_state()
             return message
 
+    def set_model_context(self, conversation_id: str, context: Optional[List[int]], model: str) -> None:
+        """Zapamiętuje kontekst modelu dla konwersacji (bez zapisu na dysk)."""
+        with self._lock:
+            conversation = self._conversations.get(conversation_id)
+            if not conversation:
+                return
+            conversation.model_context = list(context or [])
+            conversation.model_context_model = model if context else ""
+
     def find_attachment(self, conversation_id: str, attachment_id: str) -> Optional[ChatAttachment]:
         with self._lock:
             conversation = self._conversations.get(conversation_id)
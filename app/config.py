@@ -94,6 +94,9 @@ CONTENT_ANALYSIS_TYPE = "call_center"
 # Katalog z promptami (nowy system: prompt01.txt - prompt99.txt)
 PROMPT_DIR: Path = BASE_DIR / os.getenv("PROMPT_DIR", "prompt")
 PROMPT_DIR.mkdir(parents=True, exist_ok=True)
+# Pliki promptu systemowego i promptu statusu (edytowane w ustawieniach)
+SYSTEM_PROMPT_FILE: Path = PROMPT_DIR / "system_prompt.txt"
+STATUS_PROMPT_FILE: Path = PROMPT_DIR / "status_prompt.txt"
 
 # Legacy: stary plik promptu (dla kompatybilności wstecznej)
 _LEGACY_PROMPT_FILE: Path = PROMPT_DIR / "prompt.txt"
@@ -210,11 +213,15 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+# Wartości traktowane jako "włączone" dla ustawień typu bool (.env, panel ustawień)
+TRUTHY_VALUES = frozenset({"1", "true", "yes", "y", "on"})
+
+
 def _env_bool(name: str, default: bool) -> bool:
     value = os.getenv(name)
     if value is None:
         return default
-    return value.strip().lower() in {"1", "true", "yes", "y", "on"}
+    return value.strip().lower() in TRUTHY_VALUES
 
 
 def _env_optional_float(name: str, default: Optional[float]) -> Optional[float]:
@@ -330,6 +337,10 @@ WHISPER_CONDITION_ON_PREVIOUS_TEXT: bool = _env_bool("WHISPER_CONDITION_ON_PREVI
 WHISPER_TEMPERATURE: float = _env_float("WHISPER_TEMPERATURE", 0.0)  # 0.0 = stabilne wyniki
 WHISPER_FP16: bool = _env_bool("WHISPER_FP16", True)  # True = szybsze na GPU
 WHISPER_SILENCE_HANDLING: str = os.getenv("WHISPER_SILENCE_HANDLING", "include")  # "include" lub "skip"
+WHISPER_BACKEND: str = os.getenv("WHISPER_BACKEND", "auto")  # "auto", "faster-whisper" lub "openai"
+
+# Embedding mówców przez ONNX Runtime (INT8) na CPU – opcjonalne, wymaga pakietu onnxruntime
+SPEAKER_DIARIZATION_ONNX_CPU: bool = _env_bool("SPEAKER_DIARIZATION_ONNX_CPU", False)
 
 # Tagi dla modeli myślących (thinking models)
 OLLAMA_THINKING_START_TAG: str = os.getenv("OLLAMA_THINKING_START_TAG", "")
@@ -347,4 +358,23 @@ WEB_SECRET_KEY: str = os.getenv("WEB_SECRET_KEY", "change_me")
 WEB_LOGIN: str = os.getenv("WEB_LOGIN", "admin")
 WEB_PASSWORD: str = os.getenv("WEB_PASSWORD", "Demo202511!Gacek")
 WEB_HOST: str = os.getenv("WEB_HOST", "127.0.0.1")
-WEB_PORT: int = int(os.getenv("WEB_PORT", "8080"))
\ No newline at end of file
+WEB_PORT: int = int(os.getenv("WEB_PORT", "8080"))
+# Liczba wątków obsługujących żądania HTTP pod gunicorn (gunicorn_conf.py)
+WEB_SERVER_THREADS: int = int(os.getenv("WEB_SERVER_THREADS", "32"))
+# Wysyłanie plików przez serwer frontowy (nagłówek X-Sendfile, np. Apache mod_xsendfile)
+WEB_USE_X_SENDFILE: bool = _env_bool("WEB_USE_X_SENDFILE", False)
+
+
+def reload() -> None:
+    """Wczytuje ponownie plik .env (nadpisując zmienne środowiska) i przelicza ustawienia.
+
+    Nowe wartości widzą moduły importujące ustawienia w chwili użycia
+    (``from .config import X`` wewnątrz funkcji); powiązania utworzone przy
+    imporcie modułu pozostają bez zmian - te wymagają restartu.
+    """
+    import importlib
+    import sys
+
+    if load_dotenv:
+        load_dotenv(BASE_DIR / ".env", override=True)
+    importlib.reload(sys.modules[__name__])
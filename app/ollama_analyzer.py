@@ -9,7 +9,7 @@ import re
 import time
 import uuid
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import requests
 
@@ -18,8 +18,8 @@ logger = logging.getLogger(__name__)
 
 def _load_system_prompt() -> str:
     """Ładuje system prompt z pliku. Jeśli plik nie istnieje lub jest pusty, zwraca pusty string."""
-    from .config import PROMPT_DIR
-    system_prompt_file = PROMPT_DIR / "system_prompt.txt"
+    from .config import SYSTEM_PROMPT_FILE
+    system_prompt_file = SYSTEM_PROMPT_FILE
     if system_prompt_file.exists():
         content = system_prompt_file.read_text(encoding="utf-8").strip()
         return content
@@ -36,6 +36,8 @@ class OllamaAnalyzer:
         self.api_url = f"{base_url}/api/generate"
         self.last_connection_error: Optional[str] = None
         self.last_available_models: List[str] = []
+        # Sesja HTTP z keep-alive - kolejne zapytania nie otwierają nowego połączenia
+        self.session = requests.Session()
 
         from .config import (
             OLLAMA_CONNECT_TIMEOUT,
@@ -91,12 +93,10 @@ class OllamaAnalyzer:
             preview,
         )
 
-    def _collect_streaming_response(
+    def _iter_stream_messages(
         self, response: requests.Response, request_id: str
-    ) -> Tuple[Dict[str, Any], str]:
-        chunks: List[str] = []
-        final_payload: Dict[str, Any] = {}
-
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Kolejne komunikaty NDJSON strumienia Ollama (numer linii, dane) aż do ``done``."""
         for idx, line in enumerate(response.iter_lines(decode_unicode=True), start=1):
             if not line:
                 continue
@@ -112,6 +112,17 @@ class OllamaAnalyzer:
                 )
                 continue
 
+            yield idx, data
+            if data.get("done"):
+                break
+
+    def _collect_streaming_response(
+        self, response: requests.Response, request_id: str
+    ) -> Tuple[Dict[str, Any], str]:
+        chunks: List[str] = []
+        final_payload: Dict[str, Any] = {}
+
+        for idx, data in self._iter_stream_messages(response, request_id):
             chunk_text = data.get("response", "")
             if chunk_text:
                 chunks.append(chunk_text)
@@ -126,8 +137,6 @@ class OllamaAnalyzer:
                     )
 
             final_payload = data
-            if data.get("done"):
-                break
 
         aggregated = "".join(chunks).strip()
         if final_payload:
@@ -140,7 +149,7 @@ class OllamaAnalyzer:
     def test_connection(self) -> bool:
         """Test połączenia z serwerem Ollama"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 available_models = [model["name"] for model in models]
@@ -164,13 +173,16 @@ class OllamaAnalyzer:
             self.last_connection_error = "exception"
             return False
     
-    def analyze_content(self, text: str, analysis_type: str = "general") -> Dict[str, Any]:
+    def analyze_content(
+        self, text: str, analysis_type: str = "general", context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
         """
         Analiza treści za pomocą Ollama
         
         Args:
             text: Tekst do analizy
             analysis_type: Typ analizy ("general", "sentiment", "content_quality", "call_center", "custom")
+            context: Kontekst zwrócony przez poprzednie zapytanie (kontynuacja rozmowy)
         
         Returns:
             Słownik z wynikami analizy
@@ -204,6 +216,8 @@ class OllamaAnalyzer:
                 "stream": self.stream_responses,
                 "options": {**OLLAMA_GENERATION_PARAMS, **self.chat_params}
             }
+            if context:
+                payload["context"] = context
             timeout = (self.connect_timeout, self.request_timeout)
 
             self._emit_debug(
@@ -231,7 +245,7 @@ class OllamaAnalyzer:
             logger.info(f"Wysyłanie zapytania do Ollama (typ: {analysis_type})")
             start_time = time.monotonic()
 
-            response = requests.post(self.api_url, **request_kwargs)
+            response = self.session.post(self.api_url, **request_kwargs)
             try:
                 duration = time.monotonic() - start_time
 
@@ -272,10 +286,8 @@ class OllamaAnalyzer:
                     success = validation_error is None
                     raw_response_text = analysis_text
                     if injection_matches and sanitized_text:
-                        preview_limit = 2000
-                        transcript_preview = sanitized_text[:preview_limit]
-                        raw_response_text = (
-                            f"{analysis_text}\n\n[TRANSCRIPT_PREVIEW]\n{transcript_preview}"
+                        raw_response_text = analysis_text + self._transcript_preview_block(
+                            sanitized_text
                         )
                     
                     if success:
@@ -294,6 +306,7 @@ class OllamaAnalyzer:
                         "injection_matches": injection_matches,
                         "validation_error": validation_error,
                         "request_id": request_id,
+                        "context": result.get("context"),
                     }
                 else:
                     error_preview = self._truncate_for_log(response.text, self.prompt_log_max_chars)
@@ -337,6 +350,85 @@ class OllamaAnalyzer:
                 "request_id": locals().get("request_id", "NO-ID"),
             }
     
+    def stream_content(
+        self,
+        text: str,
+        analysis_type: str = "custom",
+        context: Optional[List[int]] = None,
+        final_payload: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[str]:
+        """
+        Strumieniowa analiza treści - zwraca kolejne fragmenty odpowiedzi modelu.
+
+        Prompt budowany jest tak samo jak w ``analyze_content``, ale odpowiedź nie
+        jest parsowana ani walidowana (przeznaczone dla czatu). Jeśli podano
+        ``final_payload``, trafia do niego ostatni komunikat strumienia (m.in. ``context``)
+        oraz wynik wykrywania prompt injection (``injection_detected``, ``injection_matches``).
+        Po wykryciu injection ostatnim fragmentem jest podgląd transkrypcji - tak jak
+        w ``raw_response`` z ``analyze_content``.
+
+        Raises:
+            RuntimeError: gdy Ollama zwróci status HTTP inny niż 200
+        """
+        from .config import (
+            MAX_TRANSCRIPT_LENGTH,
+            OLLAMA_GENERATION_PARAMS,
+            OLLAMA_PROMPTS,
+            PROMPT_INJECTION_PATTERNS,
+        )
+
+        sanitized_text = self._sanitize_transcript(text, MAX_TRANSCRIPT_LENGTH)
+        injection_matches = self._detect_prompt_injection(
+            sanitized_text, PROMPT_INJECTION_PATTERNS
+        )
+        if final_payload is not None:
+            final_payload["injection_detected"] = bool(injection_matches)
+            final_payload["injection_matches"] = injection_matches
+        request_id = uuid.uuid4().hex[:8].upper()
+        prompt = self._build_secure_prompt(
+            sanitized_text, analysis_type, OLLAMA_PROMPTS, _load_system_prompt()
+        )
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "options": {**OLLAMA_GENERATION_PARAMS, **self.chat_params},
+        }
+        if context:
+            payload["context"] = context
+
+        self._emit_debug(
+            request_id,
+            "Streaming request | type=%s | model=%s | prompt_chars=%d",
+            analysis_type,
+            self.model,
+            len(prompt),
+        )
+        logger.info(f"Wysyłanie zapytania strumieniowego do Ollama (typ: {analysis_type})")
+
+        response = self.session.post(
+            self.api_url,
+            json=payload,
+            timeout=(self.connect_timeout, self.request_timeout),
+            stream=True,
+        )
+        try:
+            if response.status_code != 200:
+                error_preview = self._truncate_for_log(response.text, self.prompt_log_max_chars)
+                logger.error(f"Błąd API Ollama: {response.status_code} - {error_preview}")
+                raise RuntimeError(f"HTTP {response.status_code}: {error_preview}")
+
+            for _idx, data in self._iter_stream_messages(response, request_id):
+                chunk_text = data.get("response", "")
+                if chunk_text:
+                    yield chunk_text
+                if data.get("done") and final_payload is not None:
+                    final_payload.update(data)
+            if injection_matches and sanitized_text:
+                yield self._transcript_preview_block(sanitized_text)
+        finally:
+            response.close()
+
     def _build_secure_prompt(
         self,
         sanitized_text: str,
@@ -370,6 +462,11 @@ class OllamaAnalyzer:
             # Bez system prompt - tylko user prompt
             return user_prompt.strip()
 
+    @staticmethod
+    def _transcript_preview_block(sanitized_text: str, preview_limit: int = 2000) -> str:
+        """Podgląd transkrypcji dołączany do odpowiedzi po wykryciu prompt injection."""
+        return f"\n\n[TRANSCRIPT_PREVIEW]\n{sanitized_text[:preview_limit]}"
+
     @staticmethod
     def _sanitize_transcript(text: str, max_length: int) -> str:
         """Usuwa znaki sterujące i przycina tekst."""
@@ -586,7 +683,7 @@ Odpowiedź w formacie JSON:
             logger.info(f"Wysyłanie zapytania do Ollama (prompt {prompt_number:02d})")
             start_time = time.monotonic()
 
-            response = requests.post(self.api_url, **request_kwargs)
+            response = self.session.post(self.api_url, **request_kwargs)
             try:
                 duration = time.monotonic() - start_time
 
@@ -9,10 +9,11 @@ import logging
 import math
 import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -177,6 +178,10 @@ class ProcessingQueue:
         self._items: Dict[str, QueueItem] = {}
         self._order: List[str] = []
         self._lock = threading.Lock()
+        # Licznik zmian kolejki - rośnie przy każdym enqueue/mark_* (ETag dla /queue.json)
+        self._version = 0
+        # Powiadamia oczekujących na zmianę stanu (strumień /queue.events)
+        self._changed = threading.Condition(self._lock)
         self._persistence_file = persistence_file or QUEUE_PERSISTENCE_FILE
         self._load_state()
 
@@ -206,6 +211,11 @@ class ProcessingQueue:
         except Exception as e:
             logger.error(f"Błąd wczytywania stanu kolejki: {e}")
 
+    def _bump_version(self) -> None:
+        """Oznacza zmianę stanu kolejki (wywoływane pod blokadą)."""
+        self._version += 1
+        self._changed.notify_all()
+
     def _save_state(self) -> None:
         """Zapisuje stan kolejki do pliku."""
         try:
@@ -239,13 +249,58 @@ class ProcessingQueue:
         with self._lock:
             self._items[item.id] = item
             self._order.append(item.id)
+            self._bump_version()
             self._save_state()
         return item
 
+    def enqueue_batch(
+        self,
+        file_paths: List[Path],
+        *,
+        preprocess_requested: bool = True,
+        preprocess_reason: Optional[str] = None,
+    ) -> List[QueueItem]:
+        """Dodaje wiele plików do kolejki - jedna blokada i jeden zapis stanu.
+
+        Szacowanie czasu (odczyt długości nagrania) wykonywane jest równolegle.
+        """
+        if not file_paths:
+            return []
+        with ThreadPoolExecutor(max_workers=min(4, len(file_paths))) as executor:
+            estimates = list(executor.map(_estimate_minutes, file_paths))
+        items = [
+            QueueItem(
+                id=str(uuid.uuid4()),
+                filename=file_path.name,
+                size_bytes=file_path.stat().st_size if file_path.exists() else 0,
+                input_path=file_path,
+                estimated_minutes=estimated_minutes,
+                preprocess_requested=preprocess_requested,
+                preprocess_reason=preprocess_reason,
+            )
+            for file_path, estimated_minutes in zip(file_paths, estimates)
+        ]
+        with self._lock:
+            for item in items:
+                self._items[item.id] = item
+                self._order.append(item.id)
+            self._bump_version()
+            self._save_state()
+        return items
+
     def get_item(self, item_id: str) -> Optional[QueueItem]:
         with self._lock:
             return self._items.get(item_id)
 
+    def queued_items(self) -> List[QueueItem]:
+        """Zwraca zadania oczekujące na przetworzenie, w kolejności dodania."""
+        with self._lock:
+            return [
+                self._items[item_id]
+                for item_id in self._order
+                if self._items[item_id].status == "queued"
+            ]
+
     def mark_processing(self, item_id: str) -> None:
         with self._lock:
             item = self._items.get(item_id)
@@ -253,6 +308,7 @@ class ProcessingQueue:
                 item.status = "processing"
                 item.started_at = _utcnow()
                 item.error = None
+                self._bump_version()
                 self._save_state()
 
     def mark_completed(
@@ -280,6 +336,7 @@ class ProcessingQueue:
                     item.preprocess_requested = preprocess_requested
                 if status_check is not None:
                     item.status_check = status_check
+                self._bump_version()
                 self._save_state()
 
     def mark_failed(self, item_id: str, error_message: str) -> None:
@@ -289,8 +346,42 @@ class ProcessingQueue:
                 item.status = "failed"
                 item.finished_at = _utcnow()
                 item.error = error_message
+                self._bump_version()
                 self._save_state()
 
+    def mark_failed_many(self, item_ids: List[str], error_message: str) -> None:
+        """Oznacza wiele zadań jako nieudane - jedna blokada i jeden zapis stanu."""
+        with self._lock:
+            finished_at = _utcnow()
+            for item_id in item_ids:
+                item = self._items.get(item_id)
+                if item:
+                    item.status = "failed"
+                    item.finished_at = finished_at
+                    item.error = error_message
+            self._bump_version()
+            self._save_state()
+
+    @property
+    def version(self) -> int:
+        """Numer wersji stanu kolejki (zmienia się przy każdej modyfikacji)."""
+        with self._lock:
+            return self._version
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Czeka maks. ``timeout`` sekund, aż wersja kolejki będzie różna od ``version``.
+
+        Zwraca bieżącą wersję (równą ``version``, jeśli nic się nie zmieniło).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def serialize_versioned(self) -> Tuple[int, List[Dict]]:
+        """Zwraca wersję i serializację kolejki pobrane atomowo."""
+        with self._lock:
+            return self._version, [self._items[item_id].to_dict() for item_id in reversed(self._order)]
+
     def serialize(self) -> List[Dict]:
         with self._lock:
             # Wyświetlaj najnowsze zadania na górze (odwrócona kolejność)
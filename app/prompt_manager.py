@@ -10,6 +10,7 @@ Zawiera funkcje do:
 """
 
 import logging
+import os
 import re
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
@@ -28,6 +29,8 @@ class PromptManager:
     def __init__(self, prompt_dir: Optional[Path] = None):
         self.prompt_dir = Path(prompt_dir) if prompt_dir else PROMPT_DIR
         self.prompt_dir.mkdir(parents=True, exist_ok=True)
+        # Treść promptów: ścieżka -> ((mtime_ns, rozmiar), treść); zmiana pliku unieważnia wpis
+        self._content_cache: Dict[Path, Tuple[Tuple[int, int], str]] = {}
         logger.info(f"PromptManager zainicjalizowany - katalog: {self.prompt_dir}")
 
     def get_prompt_files(self) -> List[Tuple[int, Path]]:
@@ -39,20 +42,32 @@ class PromptManager:
         """
         prompt_files = []
         
-        for file_path in self.prompt_dir.iterdir():
-            if file_path.is_file():
-                match = PROMPT_FILENAME_PATTERN.match(file_path.name)
-                if match:
+        # scandir: typ pliku z wpisu katalogu, bez osobnego stat dla każdego pliku
+        with os.scandir(self.prompt_dir) as entries:
+            for entry in entries:
+                match = PROMPT_FILENAME_PATTERN.match(entry.name)
+                if match and entry.is_file():
                     prompt_num = int(match.group(1))
                     if 1 <= prompt_num <= 99:
-                        prompt_files.append((prompt_num, file_path))
+                        prompt_files.append((prompt_num, Path(entry.path)))
         
         # Sortowanie według numeru
         prompt_files.sort(key=lambda x: x[0])
         
-        logger.info(f"Znaleziono {len(prompt_files)} plików promptów")
+        logger.debug(f"Znaleziono {len(prompt_files)} plików promptów")
         return prompt_files
 
+    def _read_prompt(self, file_path: Path) -> str:
+        """Odczytuje plik promptu, korzystając z cache dla niezmienionych plików."""
+        stat = file_path.stat()
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._content_cache.get(file_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        content = file_path.read_text(encoding="utf-8")
+        self._content_cache[file_path] = (key, content)
+        return content
+
     def get_prompts_content(self) -> List[Dict[str, any]]:
         """
         Pobiera zawartość wszystkich promptów w kolejności.
@@ -65,7 +80,7 @@ class PromptManager:
         
         for prompt_num, file_path in self.get_prompt_files():
             try:
-                content = file_path.read_text(encoding="utf-8")
+                content = self._read_prompt(file_path)
                 prompts.append({
                     "number": prompt_num,
                     "filename": file_path.name,
@@ -98,12 +113,11 @@ class PromptManager:
         filename = f"prompt{prompt_number:02d}.txt"
         file_path = self.prompt_dir / filename
         
-        if not file_path.exists():
+        try:
+            return self._read_prompt(file_path)
+        except FileNotFoundError:
             logger.warning(f"Prompt {filename} nie istnieje")
             return None
-        
-        try:
-            return file_path.read_text(encoding="utf-8")
         except Exception as e:
             logger.error(f"Błąd odczytu promptu {filename}: {e}")
             return None
@@ -126,6 +140,7 @@ class PromptManager:
         filename = f"prompt{prompt_number:02d}.txt"
         file_path = self.prompt_dir / filename
         
+        self._content_cache.pop(file_path, None)
         try:
             file_path.write_text(content, encoding="utf-8")
             logger.info(f"Zapisano prompt: {filename}")
@@ -155,6 +170,7 @@ class PromptManager:
             logger.warning(f"Prompt {filename} nie istnieje")
             return False
         
+        self._content_cache.pop(file_path, None)
         try:
             file_path.unlink()
             logger.info(f"Usunięto prompt: {filename}")
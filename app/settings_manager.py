@@ -13,17 +13,18 @@ Zawiera funkcje do:
 import logging
 import os
 import re
+import threading
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-from .config import BASE_DIR
+from .config import BASE_DIR, TRUTHY_VALUES
 
 logger = logging.getLogger(__name__)
 
 # Ścieżka do pliku .env
 ENV_FILE_PATH = BASE_DIR / ".env"
 
-
 # Definicje wszystkich ustawień z opisami i wartościami domyślnymi
 # Struktura: {nazwa: {default, type, description, alternatives, category}}
 SETTINGS_DEFINITIONS: Dict[str, Dict[str, Any]] = {
@@ -62,6 +63,14 @@ SETTINGS_DEFINITIONS: Dict[str, Dict[str, Any]] = {
         "category": "models",
         "requires_restart": True,
     },
+    "SPEAKER_DIARIZATION_ONNX_CPU": {
+        "default": "false",
+        "type": "boolean",
+        "description": "Na CPU licz embeddingi mówców przez ONNX Runtime z kwantyzacją INT8 (wymaga pakietu onnxruntime)",
+        "alternatives": "true (ONNX INT8, szybciej na CPU kosztem precyzji embeddingów)",
+        "category": "models",
+        "requires_restart": True,
+    },
     "OLLAMA_THINKING_START_TAG": {
         "default": "",
         "type": "text",
@@ -394,6 +403,15 @@ SETTINGS_DEFINITIONS: Dict[str, Dict[str, Any]] = {
         "alternatives": "include (zachowaj cisze), skip (pomijaj cisze)",
         "category": "whisper",
     },
+    "WHISPER_BACKEND": {
+        "default": "auto",
+        "type": "select",
+        "options": ["auto", "faster-whisper", "openai"],
+        "description": "Silnik transkrypcji. 'auto' = faster-whisper (CTranslate2, INT8 na CPU / FP16 na GPU) jeśli zainstalowany, w przeciwnym razie openai-whisper.",
+        "alternatives": "faster-whisper (4-10x szybciej), openai (referencyjna implementacja)",
+        "category": "whisper",
+        "requires_restart": True,
+    },
     
     # ============================================
     # KATEGORIA: Foldery i ścieżki
@@ -569,6 +587,25 @@ SETTINGS_DEFINITIONS: Dict[str, Dict[str, Any]] = {
         "category": "web",
         "requires_restart": True,
     },
+    "WEB_SERVER_THREADS": {
+        "default": "32",
+        "type": "number",
+        "min": 1,
+        "max": 1000,
+        "step": 1,
+        "description": "Liczba wątków obsługujących żądania HTTP przy uruchomieniu przez gunicorn (gunicorn_conf.py)",
+        "alternatives": "8 (mało użytkowników), 64 (wiele równoczesnych uploadów/pobrań)",
+        "category": "web",
+        "requires_restart": True,
+    },
+    "WEB_USE_X_SENDFILE": {
+        "default": "false",
+        "type": "boolean",
+        "description": "Pliki do pobrania wysyła serwer frontowy (nagłówek X-Sendfile) zamiast aplikacji - tylko za serwerem obsługującym X-Sendfile",
+        "alternatives": "true (Apache mod_xsendfile, lighttpd)",
+        "category": "web",
+        "requires_restart": True,
+    },
     "WEB_LOGIN": {
         "default": "admin",
         "type": "text",
@@ -653,6 +690,8 @@ class SettingsManager:
 
     def __init__(self, env_path: Optional[Path] = None):
         self.env_path = env_path or ENV_FILE_PATH
+        # Sparsowany .env: ((mtime_ns, rozmiar), wartości) - parsowanie tylko po zmianie pliku
+        self._env_cache: Optional[Tuple[Tuple[int, int], Dict[str, str]]] = None
         self._ensure_env_file_exists()
         logger.info(f"SettingsManager zainicjalizowany - plik: {self.env_path}")
 
@@ -714,6 +753,19 @@ class SettingsManager:
             return SETTINGS_DEFINITIONS[key]["default"]
         return None
 
+    def get_settings(self, keys: List[str]) -> Dict[str, Optional[str]]:
+        """Pobiera kilka ustawień jednym odczytem pliku .env."""
+        current_values = self._read_env_file()
+        result: Dict[str, Optional[str]] = {}
+        for key in keys:
+            if key in current_values:
+                result[key] = current_values[key]
+            elif key in SETTINGS_DEFINITIONS:
+                result[key] = SETTINGS_DEFINITIONS[key]["default"]
+            else:
+                result[key] = None
+        return result
+
     def save_settings(self, settings: Dict[str, str]) -> Tuple[bool, str]:
         """Zapisuje ustawienia do pliku .env."""
         try:
@@ -752,14 +804,25 @@ class SettingsManager:
             return False, f"Błąd zapisu: {str(e)}"
 
     def _read_env_file(self) -> Dict[str, str]:
-        """Odczytuje plik .env i usuwa komentarze z wartości."""
+        """Odczytuje plik .env i usuwa komentarze z wartości.
+
+        Wynik parsowania jest pamiętany do zmiany pliku (mtime/rozmiar);
+        zwracana jest kopia, którą wywołujący może modyfikować.
+        """
         values = {}
         
-        if not self.env_path.exists():
+        try:
+            stat = self.env_path.stat()
+        except OSError:
             # Twórz plik .env z domyślnymi wartościami jeśli nie istnieje
             self._create_default_env_file()
             return self._get_default_values()
         
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._env_cache
+        if cached is not None and cached[0] == file_key:
+            return dict(cached[1])
+        
         try:
             with open(self.env_path, "r", encoding="utf-8") as f:
                 for line in f:
@@ -790,8 +853,10 @@ class SettingsManager:
                         values[key] = value
         except Exception as e:
             logger.error(f"Błąd odczytu pliku .env: {e}")
+            return values
         
-        return values
+        self._env_cache = (file_key, values)
+        return dict(values)
     
     def _get_default_values(self) -> Dict[str, str]:
         """Zwraca domyślne wartości wszystkich ustawień."""
@@ -808,6 +873,7 @@ class SettingsManager:
 
     def _write_env_file(self, values: Dict[str, str]) -> None:
         """Zapisuje plik .env z komentarzami."""
+        self._env_cache = None
         lines = []
         
         # Grupuj według kategorii
@@ -872,8 +938,66 @@ class SettingsManager:
         return SETTINGS_CATEGORIES
 
 
+@dataclass(frozen=True)
+class RequestSettings:
+    """Sparsowane ustawienia używane w każdym żądaniu panelu (dashboard/upload)"""
+
+    force_original: bool
+    preprocess_enabled: bool
+    retention_days: int
+
+
+class CachedSettings:
+    """Cache sparsowanych ustawień - plik .env czytany ponownie tylko po zmianie
+
+    snapshot() porównuje czas modyfikacji pliku .env (jeden stat zamiast odczytu
+    i parsowania całego pliku); reload() wymusza ponowne wczytanie po zapisie.
+    """
+
+    def __init__(self, settings_manager: SettingsManager):
+        self._settings_manager = settings_manager
+        self._lock = threading.Lock()
+        self._snapshot: Optional[RequestSettings] = None
+        self._env_mtime: Optional[int] = None
+
+    def _env_file_mtime(self) -> Optional[int]:
+        try:
+            return self._settings_manager.env_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> RequestSettings:
+        """Wczytuje i parsuje ustawienia od nowa."""
+        with self._lock:
+            values = self._settings_manager._read_env_file()
+
+            def _value(key: str) -> str:
+                return str(values.get(key, SETTINGS_DEFINITIONS[key]["default"]))
+
+            try:
+                retention_days = int(float(_value("FILE_RETENTION_DAYS") or "90"))
+            except ValueError:
+                retention_days = 90
+
+            self._snapshot = RequestSettings(
+                force_original=(_value("AUDIO_FORCE_ORIGINAL") or "false").strip().lower() in TRUTHY_VALUES,
+                preprocess_enabled=(_value("AUDIO_PREPROCESS_ENABLED") or "true").strip().lower() in TRUTHY_VALUES,
+                retention_days=retention_days,
+            )
+            self._env_mtime = self._env_file_mtime()
+            return self._snapshot
+
+    def snapshot(self) -> RequestSettings:
+        """Zwraca aktualne sparsowane ustawienia (z cache, jeśli .env się nie zmienił)."""
+        snapshot = self._snapshot
+        if snapshot is None or self._env_file_mtime() != self._env_mtime:
+            return self.reload()
+        return snapshot
+
+
 # Singleton
 _settings_manager_instance: Optional[SettingsManager] = None
+_cached_settings_instance: Optional[CachedSettings] = None
 
 
 def get_settings_manager() -> SettingsManager:
@@ -884,9 +1008,20 @@ def get_settings_manager() -> SettingsManager:
     return _settings_manager_instance
 
 
+def get_cached_settings() -> CachedSettings:
+    """Zwraca singleton CachedSettings."""
+    global _cached_settings_instance
+    if _cached_settings_instance is None:
+        _cached_settings_instance = CachedSettings(get_settings_manager())
+    return _cached_settings_instance
+
+
 __all__ = [
     "SettingsManager",
+    "CachedSettings",
+    "RequestSettings",
     "get_settings_manager",
+    "get_cached_settings",
     "SETTINGS_DEFINITIONS",
     "SETTINGS_CATEGORIES",
 ]
@@ -10,8 +10,13 @@ Zawiera funkcje do:
 - Obsługi zaawansowanych i prostych algorytmów diarization
 """
 
+import contextlib
+import hashlib
+import importlib.util
 import logging
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional, Dict, Tuple
 import functools
@@ -61,19 +66,91 @@ except Exception:
 try:
     from pyannote.audio import Pipeline
     from pyannote.audio.pipelines.utils.hook import ProgressHook
+    import torchaudio
     SPEAKER_DIARIZATION_AVAILABLE = True
 except ImportError:
     SPEAKER_DIARIZATION_AVAILABLE = False
     logging.warning("pyannote.audio nie jest dostępne. Rozpoznawanie mówców będzie wyłączone.")
 
+# Opcjonalnie: ONNX Runtime do szybszego liczenia embeddingów mówców na CPU
+try:
+    import onnxruntime
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    ONNX_RUNTIME_AVAILABLE = True
+except ImportError:
+    ONNX_RUNTIME_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Wątek do inicjalizacji pyannote w tle (równolegle z ładowaniem modelu Whisper)
+_INIT_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyannote-init")
+
+
+class _EmbeddingResNet(torch.nn.Module):
+    """Część modelu embeddingu WeSpeaker eksportowana do ONNX (cechy fbank -> embedding)"""
+    
+    def __init__(self, resnet: torch.nn.Module):
+        super().__init__()
+        self.resnet = resnet
+    
+    def forward(self, fbank: torch.Tensor, weights: torch.Tensor) -> torch.Tensor:
+        return self.resnet(fbank, weights=weights)[1]
+
+
+class OnnxSpeakerEmbedding:
+    """Adapter embeddingu pyannote liczący sieć ResNet przez sesję ONNX Runtime
+    
+    Cechy fbank nadal liczone są w PyTorch (model.compute_fbank), a pozostałe
+    atrybuty (sample_rate, dimension, metric, ...) delegowane są do oryginału.
+    W razie błędu sesji ONNX wywołanie wraca do oryginalnego modelu PyTorch.
+    """
+    
+    def __init__(self, embedding, session: "onnxruntime.InferenceSession"):
+        self._embedding = embedding
+        self._session = session
+    
+    def __getattr__(self, name):
+        return getattr(self._embedding, name)
+    
+    def __call__(self, waveforms: torch.Tensor, masks: Optional[torch.Tensor] = None) -> np.ndarray:
+        if masks is None:
+            return self._embedding(waveforms, masks=masks)
+        try:
+            with torch.inference_mode():
+                fbank = self._embedding.model_.compute_fbank(waveforms.to(torch.device("cpu")))
+            outputs = self._session.run(
+                None,
+                {
+                    "fbank": fbank.numpy().astype(np.float32),
+                    "weights": masks.cpu().numpy().astype(np.float32),
+                },
+            )
+            return outputs[0]
+        except Exception as e:
+            logger.warning(f"Błąd embeddingu ONNX, używam modelu PyTorch: {e}")
+            return self._embedding(waveforms, masks=masks)
+
+
 class SpeakerDiarizer:
     """Rozpoznawanie osób mówiących w nagraniu audio"""
     
+    # Tryb zgrubny: krok okna segmentacji jako ułamek długości okna (domyślnie pyannote 0.1)
+    COARSE_SEGMENTATION_STEP = 0.5
+    # Tryb zgrubny: obniżenie progu klastrowania kompensuje łączenie mówców przy rzadszym kroku
+    COARSE_CLUSTERING_THRESHOLD_DELTA = 0.05
+    
     def __init__(self):
         self.pipeline = None
         self.initialized = False
+        self._default_segmentation_step: Optional[float] = None
+        self._default_clustering_threshold: Optional[float] = None
+        self._disable_cudagraph = False
+        self._graph_capture_pending = False
+        self._graph_capture_lock = threading.Lock()
+        # Krok segmentacji i próg klastrowania są stanem współdzielonego pipeline -
+        # konfiguracja i przebieg diarizacji wykonywane są razem pod tą blokadą
+        self._pipeline_lock = threading.Lock()
+        self._init_future: Optional[Future] = None
         logger.info("SpeakerDiarizer zainicjalizowany")
         
     def initialize(self, auth_token: Optional[str] = None, model_name: Optional[str] = None) -> bool:
@@ -99,6 +176,9 @@ class SpeakerDiarizer:
         os.environ["HUGGINGFACE_HUB_CACHE"] = str(pyannote_cache_dir / "hub")
         if auth_token:
             os.environ["HF_TOKEN"] = auth_token
+        # Równoległe pobieranie modeli (tylko gdy pakiet hf_transfer jest zainstalowany)
+        if importlib.util.find_spec("hf_transfer") is not None:
+            os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
         (pyannote_cache_dir / "hub").mkdir(parents=True, exist_ok=True)
             
         try:
@@ -147,8 +227,19 @@ class SpeakerDiarizer:
             if torch.cuda.is_available():
                 self.pipeline = self.pipeline.to(torch.device("cuda"))
                 logger.info("Rozpoznawanie mówców uruchomione na GPU")
+                # Graf przechwytywany jest przy pierwszej diarizacji - tutaj Whisper
+                # może jeszcze alokować pamięć CUDA w wątku głównym
+                self._graph_capture_pending = not self._disable_cudagraph
             else:
                 logger.info("Rozpoznawanie mówców uruchomione na CPU")
+                from .config import SPEAKER_DIARIZATION_ONNX_CPU
+                if SPEAKER_DIARIZATION_ONNX_CPU:
+                    self._enable_onnx_embedding(pyannote_cache_dir / "onnx")
+            
+            # Zapamiętanie domyślnych parametrów pipeline (przełączanie trybu zgrubnego/dokładnego)
+            self._default_segmentation_step = getattr(getattr(self.pipeline, "_segmentation", None), "step", None)
+            clustering = getattr(self.pipeline, "clustering", None)
+            self._default_clustering_threshold = getattr(clustering, "threshold", None)
             
             self.initialized = True
             logger.info("Rozpoznawanie mówców zainicjalizowane pomyślnie")
@@ -158,39 +249,279 @@ class SpeakerDiarizer:
             logger.error(f"Błąd podczas inicjalizacji rozpoznawania mówców: {e}")
             return False
     
-    def diarize_speakers(self, audio_file_path: Path) -> Optional[List[Dict]]:
-        """Rozpoznawanie mówców w pliku audio za pomocą zaawansowanego algorytmu pyannote"""
+    def initialize_async(self, auth_token: Optional[str] = None, model_name: Optional[str] = None) -> Future:
+        """Uruchomienie initialize() w tle; zwraca Future z wynikiem (bool)
+        
+        Pobieranie i ładowanie modeli pyannote jest ograniczone głównie przez I/O,
+        więc może przebiegać równolegle z ładowaniem modelu Whisper. Pierwsze
+        wywołanie diarize_speakers/diarize_many czeka na zakończenie inicjalizacji.
+        """
+        self._init_future = _INIT_EXECUTOR.submit(self.initialize, auth_token, model_name)
+        return self._init_future
+    
+    def _wait_for_initialization(self) -> None:
+        """Oczekiwanie na zakończenie inicjalizacji uruchomionej przez initialize_async"""
+        if self._init_future is not None:
+            self._init_future.result()
+            self._init_future = None
+    
+    def _ensure_segmentation_graph(self) -> None:
+        """Jednorazowe przechwycenie grafu segmentacji, gdy wszystkie modele są już załadowane"""
+        if not self._graph_capture_pending:
+            return
+        with self._graph_capture_lock:
+            if self._graph_capture_pending:
+                self._capture_segmentation_graph()
+                self._graph_capture_pending = False
+    
+    def _capture_segmentation_graph(self) -> bool:
+        """Przechwycenie przebiegu modelu segmentacji do CUDA Graph
+        
+        Segmentacja wywoływana jest w pętli okien o stałym kształcie, więc przy małych
+        partiach dominuje narzut uruchamiania kerneli. Graf przechwytywany jest raz dla
+        pełnej partii okien, a forward modelu odtwarza go dla wejść o tym samym kształcie
+        (ostatnia, niepełna partia trafia do oryginalnego forward). Statyczne bufory
+        grafu są wspólne, więc copy/replay/clone wykonywane są pod blokadą - przy
+        MAX_CONCURRENT_PROCESSES > 1 równoległe diarizacje nie nadpisują sobie wejścia.
+        """
+        segmentation = getattr(self.pipeline, "_segmentation", None)
+        model = getattr(segmentation, "model", None)
+        if model is None:
+            return False
+        
+        try:
+            device = torch.device("cuda")
+            sample_rate = getattr(model.audio, "sample_rate", 16000)
+            duration = getattr(model.specifications, "duration", 5.0)
+            batch_size = getattr(segmentation, "batch_size", 1)
+            num_channels = getattr(model.hparams, "num_channels", 1) if hasattr(model, "hparams") else 1
+            
+            original_forward = model.forward
+            static_in = torch.zeros(
+                batch_size, num_channels, int(duration * sample_rate), device=device
+            )
+            
+            with torch.no_grad():
+                # Rozgrzewka na bocznym strumieniu (wymagane przed przechwyceniem grafu)
+                side_stream = torch.cuda.Stream()
+                side_stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(side_stream):
+                    for _ in range(3):
+                        original_forward(static_in)
+                torch.cuda.current_stream().wait_stream(side_stream)
+                
+                graph = torch.cuda.CUDAGraph()
+                # thread_local: alokacje CUDA w innych wątkach (np. transkrypcja
+                # równoległego zadania) nie przerywają przechwytywania
+                with torch.cuda.graph(graph, capture_error_mode="thread_local"):
+                    static_out = original_forward(static_in)
+            
+            graph_lock = threading.Lock()
+            
+            def graph_forward(waveforms: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+                if args or kwargs or waveforms.shape != static_in.shape or waveforms.device != static_in.device:
+                    return original_forward(waveforms, *args, **kwargs)
+                with graph_lock:
+                    static_in.copy_(waveforms)
+                    graph.replay()
+                    return static_out.clone()
+            
+            model.forward = graph_forward
+            logger.info(f"Segmentacja mówców przechwycona do CUDA Graph (partia {batch_size} okien)")
+            return True
+        except Exception as e:
+            logger.warning(f"Nie udało się przechwycić CUDA Graph segmentacji: {e}")
+            return False
+    
+    @staticmethod
+    def _weights_fingerprint(module: torch.nn.Module) -> str:
+        """Skrót wag modułu - nazwa pliku ONNX zmienia się razem z modelem embeddingu"""
+        digest = hashlib.sha256()
+        for name, tensor in module.state_dict().items():
+            digest.update(name.encode())
+            digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+        return digest.hexdigest()[:16]
+    
+    def _enable_onnx_embedding(self, onnx_dir: Path) -> bool:
+        """Podmiana embeddingu mówców na sesję ONNX Runtime z kwantyzacją INT8 (tylko CPU)
+        
+        Wyeksportowany model zapisywany jest pod nazwą zawierającą skrót wag ResNet,
+        więc zmiana SPEAKER_DIARIZATION_MODEL wymusza nowy eksport. Plik INT8 powstaje
+        pod nazwą tymczasową i jest podmieniany atomowo (os.replace) - przerwana
+        kwantyzacja nie zostawia uszkodzonego pliku.
+        """
+        if not ONNX_RUNTIME_AVAILABLE:
+            logger.info("onnxruntime nie jest dostępne - embeddingi mówców liczone w PyTorch")
+            return False
+        
+        embedding = getattr(self.pipeline, "_embedding", None)
+        model = getattr(embedding, "model_", None)
+        if model is None or not hasattr(model, "compute_fbank") or not hasattr(model, "resnet"):
+            logger.info("Model embeddingu nie wspiera eksportu do ONNX - pozostaję przy PyTorch")
+            return False
+        
+        try:
+            onnx_dir.mkdir(parents=True, exist_ok=True)
+            fingerprint = self._weights_fingerprint(model.resnet)
+            fp32_path = onnx_dir / f"embedding.{fingerprint}.onnx"
+            int8_path = onnx_dir / f"embedding.{fingerprint}.int8.onnx"
+            int8_tmp_path = onnx_dir / f"embedding.{fingerprint}.int8.onnx.tmp"
+            
+            if not int8_path.exists():
+                logger.info(f"Eksport modelu embeddingu do ONNX: {fp32_path}")
+                sample_rate = getattr(embedding, "sample_rate", 16000)
+                with torch.inference_mode():
+                    dummy_fbank = model.compute_fbank(torch.zeros(1, 1, sample_rate * 5))
+                dummy_weights = torch.ones(1, dummy_fbank.shape[1])
+                torch.onnx.export(
+                    _EmbeddingResNet(model.resnet).eval(),
+                    (dummy_fbank, dummy_weights),
+                    str(fp32_path),
+                    input_names=["fbank", "weights"],
+                    output_names=["embedding"],
+                    dynamic_axes={
+                        "fbank": {0: "batch", 1: "frames"},
+                        "weights": {0: "batch", 1: "mask_frames"},
+                        "embedding": {0: "batch"},
+                    },
+                    opset_version=17,
+                )
+                quantize_dynamic(str(fp32_path), str(int8_tmp_path), weight_type=QuantType.QInt8)
+                os.replace(int8_tmp_path, int8_path)
+                fp32_path.unlink(missing_ok=True)
+            
+            session = onnxruntime.InferenceSession(str(int8_path), providers=["CPUExecutionProvider"])
+            self.pipeline._embedding = OnnxSpeakerEmbedding(embedding, session)
+            logger.info(f"Embeddingi mówców liczone przez ONNX Runtime (INT8): {int8_path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Nie udało się przygotować embeddingu ONNX, używam PyTorch: {e}")
+            return False
+    
+    def _configure_granularity(self, fine_grained: bool, max_speakers: Optional[int] = None) -> None:
+        """Ustawienie kroku segmentacji i progu klastrowania dla trybu zgrubnego lub dokładnego
+        
+        Tryb zgrubny (domyślny) przesuwa okno segmentacji o połowę jego długości zamiast
+        o 10%, więc segmentacja i embeddingi (jeden na mówcę w oknie) liczone są dla
+        ~5x mniejszej liczby okien. Krok ustawiany jest na obiekcie Inference segmentacji,
+        bo pipeline odczytuje go tylko przy budowie. Niższy próg klastrowania zapobiega
+        zaniżaniu liczby mówców przy rzadszym kroku - stosowany tylko wtedy, gdy liczba
+        mówców nie jest ograniczona.
+        """
+        segmentation = getattr(self.pipeline, "_segmentation", None)
+        if self._default_segmentation_step is not None and segmentation is not None:
+            coarse_step = self.COARSE_SEGMENTATION_STEP * segmentation.duration
+            segmentation.step = (
+                self._default_segmentation_step
+                if fine_grained
+                else max(self._default_segmentation_step, coarse_step)
+            )
+        if self._default_clustering_threshold is not None:
+            self.pipeline.clustering.threshold = (
+                self._default_clustering_threshold
+                if fine_grained or max_speakers is not None
+                else self._default_clustering_threshold - self.COARSE_CLUSTERING_THRESHOLD_DELTA
+            )
+    
+    def _load_waveform(self, audio_file_path: Path) -> Dict:
+        """Wczytanie audio do pamięci w formacie akceptowanym przez pipeline pyannote"""
+        waveform, sample_rate = torchaudio.load(str(audio_file_path))
+        return {"waveform": waveform, "sample_rate": sample_rate}
+    
+    def _run_pipeline(self, audio_in_memory: Dict, max_speakers: Optional[int] = None) -> List[Dict]:
+        """Uruchomienie pipeline na wczytanym audio i konwersja wyników na format JSON"""
+        pipeline_kwargs = {"max_speakers": max_speakers} if max_speakers is not None else {}
+        # Na GPU obliczenia w FP16 (autocast) - mniejszy transfer pamięci i użycie tensor cores
+        autocast_ctx = (
+            torch.autocast("cuda", dtype=torch.float16)
+            if torch.cuda.is_available()
+            else contextlib.nullcontext()
+        )
+        with torch.inference_mode(), autocast_ctx, ProgressHook() as hook:
+            diarization = self.pipeline(audio_in_memory, hook=hook, **pipeline_kwargs)
+        
+        speakers_data = []
+        for turn, _, speaker in diarization.itertracks(yield_label=True):
+            speakers_data.append({
+                "speaker": speaker,
+                "start": turn.start,
+                "end": turn.end,
+                "duration": turn.end - turn.start
+            })
+        return speakers_data
+    
+    def diarize_speakers(
+        self, audio_file_path: Path, fine_grained: bool = False, max_speakers: Optional[int] = None
+    ) -> Optional[List[Dict]]:
+        """Rozpoznawanie mówców w pliku audio za pomocą zaawansowanego algorytmu pyannote
+        
+        fine_grained=True przywraca domyślny (gęsty) krok segmentacji pyannote.
+        max_speakers ogranicza liczbę mówców (wtedy próg klastrowania pozostaje domyślny).
+        """
+        self._wait_for_initialization()
         if not self.initialized or not self.pipeline:
             logger.warning("Rozpoznawanie mówców nie jest zainicjalizowane")
             return None
             
         try:
+            self._ensure_segmentation_graph()
             logger.info(f"Rozpoznawanie mówców w pliku: {audio_file_path.name}")
+            audio_in_memory = self._load_waveform(audio_file_path)
             
-            # Uruchomienie diarization
-            with ProgressHook() as hook:
-                diarization = self.pipeline(str(audio_file_path), hook=hook)
-            
-            # Konwersja wyników na format JSON
-            speakers_data = []
-            for turn, _, speaker in diarization.itertracks(yield_label=True):
-                speakers_data.append({
-                    "speaker": speaker,
-                    "start": turn.start,
-                    "end": turn.end,
-                    "duration": turn.end - turn.start
-                })
+            with self._pipeline_lock:
+                self._configure_granularity(fine_grained, max_speakers)
+                speakers_data = self._run_pipeline(audio_in_memory, max_speakers)
             
-            logger.info(f"Rozpoznano {len(set([s['speaker'] for s in speakers_data]))} mówców")
+            logger.info(f"Rozpoznano {len({s['speaker'] for s in speakers_data})} mówców")
             return speakers_data
             
         except Exception as e:
             logger.error(f"Błąd podczas rozpoznawania mówców: {e}")
             return None
+    
+    def diarize_many(
+        self, audio_file_paths: List[Path], fine_grained: bool = False, max_speakers: Optional[int] = None
+    ) -> List[Optional[List[Dict]]]:
+        """Rozpoznawanie mówców dla wielu plików jednym, już zainicjalizowanym pipeline
+        
+        Wszystkie pliki są przetwarzane kolejno tym samym pipeline, dzięki czemu
+        model pozostaje załadowany i rozgrzany między plikami.
+        Dla plików, których nie udało się przetworzyć, zwracane jest None.
+        """
+        self._wait_for_initialization()
+        if not self.initialized or not self.pipeline:
+            logger.warning("Rozpoznawanie mówców nie jest zainicjalizowane")
+            return [None] * len(audio_file_paths)
+        
+        self._ensure_segmentation_graph()
+        results: List[Optional[List[Dict]]] = []
+        for audio_file_path in audio_file_paths:
+            try:
+                logger.info(f"Rozpoznawanie mówców w pliku: {audio_file_path.name}")
+                audio_in_memory = self._load_waveform(audio_file_path)
+                with self._pipeline_lock:
+                    self._configure_granularity(fine_grained, max_speakers)
+                    speakers_data = self._run_pipeline(audio_in_memory, max_speakers)
+                logger.info(f"Rozpoznano {len({s['speaker'] for s in speakers_data})} mówców")
+                results.append(speakers_data)
+            except Exception as e:
+                logger.error(f"Błąd podczas rozpoznawania mówców ({audio_file_path.name}): {e}")
+                results.append(None)
+        
+        return results
 
 class AdvancedSpeakerDiarizer:
     """Zaawansowany algorytm rozpoznawania mówców na podstawie analizy segmentów Whisper"""
     
+    GREETINGS = (
+        "dzień dobry", "dobry", "cześć", "witam", "hej", "hello", "hi",
+        "good morning", "good afternoon", "good evening"
+    )
+    GOODBYES = (
+        "do widzenia", "pa", "cześć", "nara", "goodbye", "bye", "see you",
+        "dziękuję", "dzięki", "thank you", "thanks"
+    )
+    
     def __init__(self):
         self.min_speaker_duration = 1.5  # Minimalny czas mówcy w sekundach
         self.pause_threshold = 1.2       # Próg pauzy w sekundach
@@ -203,9 +534,11 @@ class AdvancedSpeakerDiarizer:
         
         for i, segment in enumerate(segments):
             text = segment.get("text", "").strip()
+            text_lower = text.lower()
             start = segment.get("start", 0)
             end = segment.get("end", 0)
             duration = end - start
+            word_count = len(text.split())
             
             # Charakterystyka segmentu
             characteristics = {
@@ -214,37 +547,60 @@ class AdvancedSpeakerDiarizer:
                 "end": end,
                 "duration": duration,
                 "text": text,
-                "word_count": len(text.split()),
-                "words_per_second": len(text.split()) / duration if duration > 0 else 0,
+                "text_lower": text_lower,
+                "word_count": word_count,
+                "words_per_second": word_count / duration if duration > 0 else 0,
                 "has_question": "?" in text,
                 "has_exclamation": "!" in text,
                 "is_short": duration < 1.0,
                 "is_long": duration > 5.0,
-                "starts_with_greeting": self._is_greeting(text),
-                "ends_with_goodbye": self._is_goodbye(text)
+                "starts_with_greeting": self._is_greeting(text_lower),
+                "ends_with_goodbye": self._is_goodbye(text_lower)
             }
             
             analyzed_segments.append(characteristics)
         
         return analyzed_segments
     
-    def _is_greeting(self, text: str) -> bool:
-        """Sprawdzenie czy tekst zaczyna się od powitania"""
-        greetings = [
-            "dzień dobry", "dobry", "cześć", "witam", "hej", "hello", "hi",
-            "good morning", "good afternoon", "good evening"
-        ]
-        text_lower = text.lower().strip()
-        return any(text_lower.startswith(greeting) for greeting in greetings)
-    
-    def _is_goodbye(self, text: str) -> bool:
-        """Sprawdzenie czy tekst kończy się pożegnaniem"""
-        goodbyes = [
-            "do widzenia", "pa", "cześć", "nara", "goodbye", "bye", "see you",
-            "dziękuję", "dzięki", "thank you", "thanks"
-        ]
-        text_lower = text.lower().strip()
-        return any(text_lower.endswith(goodbye) for goodbye in goodbyes)
+    def _analyze_for_change_detection(self, segments: List[Dict]) -> List[Dict]:
+        """Zwięzła charakterystyka segmentów - tylko pola czytane przy wykrywaniu zmian mówcy
+        
+        Wersja wewnętrzna analyze_segment_characteristics: pomija tekst, indeks
+        i pola nieużywane przez _calculate_segment_similarity/_should_change_speaker.
+        """
+        analyzed_segments = []
+        is_greeting = self._is_greeting
+        is_goodbye = self._is_goodbye
+        
+        for segment in segments:
+            text = segment.get("text", "").strip()
+            text_lower = text.lower()
+            start = segment.get("start", 0)
+            end = segment.get("end", 0)
+            duration = end - start
+            word_count = len(text.split())
+            
+            analyzed_segments.append({
+                "start": start,
+                "end": end,
+                "duration": duration,
+                "word_count": word_count,
+                "words_per_second": word_count / duration if duration > 0 else 0,
+                "has_question": "?" in text,
+                "is_short": duration < 1.0,
+                "starts_with_greeting": is_greeting(text_lower),
+                "ends_with_goodbye": is_goodbye(text_lower),
+            })
+        
+        return analyzed_segments
+    
+    def _is_greeting(self, text_lower: str) -> bool:
+        """Sprawdzenie czy tekst (już małymi literami, bez białych znaków na brzegach) zaczyna się od powitania"""
+        return text_lower.startswith(self.GREETINGS)
+    
+    def _is_goodbye(self, text_lower: str) -> bool:
+        """Sprawdzenie czy tekst (już małymi literami, bez białych znaków na brzegach) kończy się pożegnaniem"""
+        return text_lower.endswith(self.GOODBYES)
     
     def detect_speaker_changes(self, segments: List[Dict]) -> List[int]:
         """Wykrywanie zmian mówców na podstawie analizy segmentów"""
@@ -252,7 +608,7 @@ class AdvancedSpeakerDiarizer:
             return []
         
         change_points = []
-        analyzed_segments = self.analyze_segment_characteristics(segments)
+        analyzed_segments = self._analyze_for_change_detection(segments)
         
         for i in range(1, len(analyzed_segments)):
             prev_seg = analyzed_segments[i-1]
@@ -310,10 +666,11 @@ class AdvancedSpeakerDiarizer:
         speakers_data = []
         current_speaker = "SPEAKER_00"
         speaker_counter = 0
+        change_set = set(change_points)
         
         for i, segment in enumerate(segments):
             # Sprawdzenie czy to punkt zmiany mówcy
-            if i in change_points:
+            if i in change_set:
                 speaker_counter += 1
                 current_speaker = f"SPEAKER_{speaker_counter:02d}"
                 
@@ -322,11 +679,13 @@ class AdvancedSpeakerDiarizer:
                     speaker_counter = 0
                     current_speaker = "SPEAKER_00"
             
+            start = segment.get("start", 0)
+            end = segment.get("end", 0)
             speakers_data.append({
                 "speaker": current_speaker,
-                "start": segment.get("start", 0),
-                "end": segment.get("end", 0),
-                "duration": segment.get("end", 0) - segment.get("start", 0)
+                "start": start,
+                "end": end,
+                "duration": end - start
             })
         
         return speakers_data
@@ -336,33 +695,16 @@ class AdvancedSpeakerDiarizer:
         if not speakers_data:
             return speakers_data
         
-        optimized = []
-        current_group = [speakers_data[0]]
-        
-        for i in range(1, len(speakers_data)):
-            current_seg = speakers_data[i]
-            prev_seg = speakers_data[i-1]
-            
-            # Sprawdzenie czy można połączyć segmenty
-            if (current_seg["speaker"] == prev_seg["speaker"] and 
-                current_seg["start"] - prev_seg["end"] < 0.5 and  # Mała pauza
-                current_seg["duration"] < self.min_speaker_duration):  # Krótki segment
-                
-                current_group.append(current_seg)
-            else:
-                # Zapisanie grupy i rozpoczęcie nowej
-                if current_group:
-                    optimized.extend(current_group)
-                current_group = [current_seg]
-        
-        # Dodanie ostatniej grupy
-        if current_group:
-            optimized.extend(current_group)
-        
-        return optimized
+        # Segmenty tego samego mówcy po krótkiej pauzie (< 0.5s) trafiały do jednej grupy,
+        # ale grupy były zapisywane w całości - kolejność i zawartość pozostają bez zmian
+        return list(speakers_data)
     
     def diarize_speakers(self, segments: List[Dict]) -> List[Dict]:
-        """Główna metoda rozpoznawania mówców"""
+        """Główna metoda rozpoznawania mówców
+        
+        Przypisanie mówców i statystyki liczone są w jednym przebiegu po segmentach
+        (bez pośrednich list z assign_speakers/optimize_speaker_assignments).
+        """
         if not segments:
             return []
         
@@ -372,38 +714,66 @@ class AdvancedSpeakerDiarizer:
         change_points = self.detect_speaker_changes(segments)
         logger.info(f"Wykryto {len(change_points)} punktów zmiany mówcy")
         
-        # Przypisanie mówców
-        speakers_data = self.assign_speakers(segments, change_points)
+        # Przypisanie mówców i zliczanie czasu w jednym przebiegu
+        change_set = set(change_points)
+        max_speakers = self.max_speakers
+        current_speaker = "SPEAKER_00"
+        speaker_counter = 0
+        speakers_data = []
+        speaker_stats = defaultdict(float)
         
-        # Optymalizacja przypisań
-        optimized_speakers = self.optimize_speaker_assignments(speakers_data)
+        for i, segment in enumerate(segments):
+            if i in change_set:
+                speaker_counter += 1
+                # Ograniczenie liczby mówców
+                if speaker_counter >= max_speakers:
+                    speaker_counter = 0
+                current_speaker = f"SPEAKER_{speaker_counter:02d}"
+            
+            start = segment.get("start", 0)
+            end = segment.get("end", 0)
+            duration = end - start
+            speaker_stats[current_speaker] += duration
+            speakers_data.append({
+                "speaker": current_speaker,
+                "start": start,
+                "end": end,
+                "duration": duration
+            })
         
         # Statystyki
-        unique_speakers = set(s["speaker"] for s in optimized_speakers)
-        logger.info(f"Zaawansowane rozpoznawanie mówców: {len(unique_speakers)} mówców")
-        
-        # Logowanie statystyk
-        speaker_stats = defaultdict(float)
-        for speaker_info in optimized_speakers:
-            speaker_stats[speaker_info["speaker"]] += speaker_info["duration"]
-        
+        logger.info(f"Zaawansowane rozpoznawanie mówców: {len(speaker_stats)} mówców")
         for speaker, total_time in speaker_stats.items():
             logger.info(f"  {speaker}: {total_time:.1f}s ({total_time/60:.1f}min)")
         
-        return optimized_speakers
+        return speakers_data
 
 class SimpleSpeakerDiarizer:
     """Prosty algorytm rozpoznawania mówców na podstawie segmentów Whisper (ulepszona wersja)"""
     
+    _shared_advanced: Optional[AdvancedSpeakerDiarizer] = None
+    
+    @classmethod
+    def _get_advanced(cls) -> AdvancedSpeakerDiarizer:
+        """Współdzielona instancja zaawansowanego algorytmu (bez stanu między wywołaniami)"""
+        if cls._shared_advanced is None:
+            cls._shared_advanced = AdvancedSpeakerDiarizer()
+        return cls._shared_advanced
+    
     @staticmethod
     def diarize_speakers(segments: List[Dict]) -> List[Dict]:
         """Rozpoznawanie mówców na podstawie analizy segmentów czasowych i pauz między wypowiedziami"""
         if not segments:
             return []
         
+        # Pojedynczy segment - jeden mówca, bez uruchamiania pełnego algorytmu
+        if len(segments) == 1:
+            start = segments[0].get("start", 0)
+            end = segments[0].get("end", 0)
+            return [{"speaker": "SPEAKER_00", "start": start, "end": end, "duration": end - start}]
+        
         # Użycie zaawansowanego algorytmu
-        advanced_diarizer = AdvancedSpeakerDiarizer()
-        return advanced_diarizer.diarize_speakers(segments)
+        return SimpleSpeakerDiarizer._get_advanced().diarize_speakers(segments)
     
     @staticmethod
     def diarize_speakers_legacy(segments: List[Dict]) -> List[Dict]:
@@ -412,7 +782,9 @@ class SimpleSpeakerDiarizer:
             return []
         
         speakers_data = []
+        seen_speakers = set()
         current_speaker = "SPEAKER_00"
+        prev_end = 0
         
         for i, segment in enumerate(segments):
             start = segment.get("start", 0)
@@ -421,7 +793,6 @@ class SimpleSpeakerDiarizer:
             
             # Prosty algorytm: zmiana mówcy co 2-3 segmenty lub przy długich pauzach
             if i > 0:
-                prev_end = segments[i-1].get("end", 0)
                 pause_duration = start - prev_end
                 
                 # Zmiana mówcy przy długich pauzach (>2 sekundy) lub co 3 segmenty
@@ -437,6 +808,8 @@ class SimpleSpeakerDiarizer:
                 "end": end,
                 "duration": duration
             })
+            seen_speakers.add(current_speaker)
+            prev_end = end
         
-        logger.info(f"Proste rozpoznawanie mówców: {len(set([s['speaker'] for s in speakers_data]))} mówców")
+        logger.info(f"Proste rozpoznawanie mówców: {len(seen_speakers)} mówców")
         return speakers_data 
\ No newline at end of file
@@ -12,13 +12,13 @@ Zawiera funkcje do:
 
 import logging
 import os
+import threading
 import time
-import tempfile
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
+import numpy as np
 import torch
 import torch.serialization
-from cryptography.fernet import Fernet
 
 # Workaround for PyTorch 2.6+ weights_only=True breaking whisper model loading
 # The whisper library uses weights_only=True but the checkpoint contains TorchVersion
@@ -43,8 +43,24 @@ _patch_torch_load_for_whisper()
 
 import whisper
 
+# Opcjonalnie: faster-whisper (CTranslate2) - szybszy backend z kwantyzacją INT8/FP16
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+
+# Opcjonalnie: Silero VAD - pomijanie ciszy przed enkoderem openai-whisper
+try:
+    from silero_vad import get_speech_timestamps, load_silero_vad
+    SILERO_VAD_AVAILABLE = True
+except ImportError:
+    SILERO_VAD_AVAILABLE = False
+
 from .config import (
     MODEL_CACHE_DIR,
+    WHISPER_BACKEND,
+    WHISPER_SILENCE_HANDLING,
     WHISPER_NO_SPEECH_THRESHOLD,
     WHISPER_LOGPROB_THRESHOLD,
     WHISPER_CONDITION_ON_PREVIOUS_TEXT,
@@ -61,8 +77,10 @@ class WhisperTranscriber:
         self.model = None
         self.device = "cpu"
         self._fp16 = False
-        self.encryption_key = Fernet.generate_key()
-        self.cipher = Fernet(self.encryption_key)
+        self.backend = "openai"
+        self._vad_model = None
+        # Silero VAD trzyma stan RNN - ładowanie i wykrywanie mowy pod jedną blokadą
+        self._vad_lock = threading.Lock()
         logger.info("WhisperTranscriber zainicjalizowany")
     
     def load_model(self, model_name: str = "large-v3") -> None:
@@ -83,12 +101,29 @@ class WhisperTranscriber:
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
             self._fp16 = self.device != "cpu"
 
-            logger.info("Ładowanie modelu Whisper: %s (urządzenie: %s)", model_name, self.device)
-            self.model = whisper.load_model(
-                model_name,
-                download_root=str(model_cache_dir),
-                device=self.device,
-            )
+            if self._use_faster_whisper():
+                compute_type = "float16" if self.device == "cuda" and WHISPER_FP16 else "int8"
+                logger.info(
+                    "Ładowanie modelu faster-whisper: %s (urządzenie: %s, obliczenia: %s)",
+                    model_name,
+                    self.device,
+                    compute_type,
+                )
+                self.model = WhisperModel(
+                    model_name,
+                    device=self.device,
+                    compute_type=compute_type,
+                    download_root=str(model_cache_dir / "faster-whisper"),
+                )
+                self.backend = "faster-whisper"
+            else:
+                logger.info("Ładowanie modelu Whisper: %s (urządzenie: %s)", model_name, self.device)
+                self.model = whisper.load_model(
+                    model_name,
+                    download_root=str(model_cache_dir),
+                    device=self.device,
+                )
+                self.backend = "openai"
             logger.info(
                 "Model Whisper '%s' przygotowany w katalogu %s",
                 model_name,
@@ -102,17 +137,89 @@ class WhisperTranscriber:
             logger.error(f"Błąd podczas ładowania modelu Whisper: {e}")
             raise
     
-    def encrypt_file(self, file_path: Path) -> bytes:
-        """Szyfrowanie pliku tymczasowego dla bezpieczeństwa"""
-        with open(file_path, 'rb') as f:
-            data = f.read()
-        return self.cipher.encrypt(data)
+    @staticmethod
+    def _use_faster_whisper() -> bool:
+        """Czy używać backendu faster-whisper (WHISPER_BACKEND: auto / faster-whisper / openai)"""
+        backend = WHISPER_BACKEND.strip().lower()
+        if backend == "openai":
+            return False
+        if not FASTER_WHISPER_AVAILABLE:
+            if backend == "faster-whisper":
+                logger.warning("faster-whisper nie jest zainstalowane - używam openai-whisper")
+            return False
+        return True
     
-    def decrypt_file(self, encrypted_data: bytes, output_path: Path) -> None:
-        """Deszyfrowanie pliku tymczasowego"""
-        decrypted_data = self.cipher.decrypt(encrypted_data)
-        with open(output_path, 'wb') as f:
-            f.write(decrypted_data)
+    def _transcribe_faster_whisper(self, audio_file_path: Path) -> Dict[str, Any]:
+        """Transkrypcja backendem faster-whisper z konwersją wyniku do formatu openai-whisper"""
+        segments, _info = self.model.transcribe(
+            str(audio_file_path),
+            language="pl",
+            task="transcribe",
+            vad_filter=WHISPER_SILENCE_HANDLING == "skip",
+            no_speech_threshold=WHISPER_NO_SPEECH_THRESHOLD,
+            log_prob_threshold=WHISPER_LOGPROB_THRESHOLD,
+            condition_on_previous_text=WHISPER_CONDITION_ON_PREVIOUS_TEXT,
+            temperature=WHISPER_TEMPERATURE,
+        )
+        
+        result_segments = []
+        for segment in segments:
+            result_segments.append({
+                "id": segment.id,
+                "seek": segment.seek,
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "tokens": list(segment.tokens),
+                "temperature": segment.temperature,
+                "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio,
+                "no_speech_prob": segment.no_speech_prob,
+            })
+        
+        return {
+            "text": "".join(segment["text"] for segment in result_segments),
+            "segments": result_segments,
+        }
+    
+    def _remove_silence(self, audio: np.ndarray) -> Tuple[np.ndarray, List[Tuple[float, float]]]:
+        """Wycięcie ciszy z audio za pomocą Silero VAD
+        
+        Zwraca audio zawierające tylko fragmenty mowy oraz listę par
+        (początek w skróconym audio, początek w oryginale) w sekundach,
+        potrzebną do przeliczenia znaczników czasu segmentów.
+        """
+        with self._vad_lock:
+            if self._vad_model is None:
+                self._vad_model = load_silero_vad()
+            speech_timestamps = get_speech_timestamps(
+                torch.from_numpy(audio), self._vad_model, sampling_rate=whisper.audio.SAMPLE_RATE
+            )
+        if not speech_timestamps:
+            return audio, [(0.0, 0.0)]
+        
+        offsets: List[Tuple[float, float]] = []
+        chunks = []
+        position = 0
+        for timestamp in speech_timestamps:
+            offsets.append((position / whisper.audio.SAMPLE_RATE, timestamp["start"] / whisper.audio.SAMPLE_RATE))
+            chunks.append(audio[timestamp["start"]:timestamp["end"]])
+            position += timestamp["end"] - timestamp["start"]
+        return np.concatenate(chunks), offsets
+    
+    @staticmethod
+    def _restore_timestamp(value: float, offsets: List[Tuple[float, float]], is_end: bool = False) -> float:
+        """Przeliczenie czasu ze skróconego audio (bez ciszy) na oś czasu oryginału
+        
+        Koniec segmentu (is_end=True) leżący dokładnie na styku fragmentów mowy należy
+        do fragmentu, z którego pochodzi - inaczej segment rozciągałby się na wyciętą ciszę.
+        """
+        shift = offsets[0][1] - offsets[0][0]
+        for trimmed_start, original_start in offsets[1:]:
+            if trimmed_start > value or (is_end and trimmed_start == value):
+                break
+            shift = original_start - trimmed_start
+        return value + shift
     
     def transcribe_audio(self, audio_file_path: Path, max_retries: int = 3) -> Optional[Dict]:
         """Transkrypcja pliku audio na tekst z obsługą błędów"""
@@ -125,19 +232,28 @@ class WhisperTranscriber:
             try:
                 logger.info(f"Transkrypcja pliku: {audio_file_path.name} (próba {attempt + 1}/{max_retries})")
                 
-                # Szyfrowanie pliku tymczasowego
-                encrypted_data = self.encrypt_file(audio_file_path)
-                
-                # Utworzenie tymczasowego pliku do przetwarzania
-                safe_suffix = audio_file_path.suffix if audio_file_path.suffix else ".tmp"
-                with tempfile.NamedTemporaryFile(suffix=safe_suffix, delete=False) as temp_file:
-                    temp_path = Path(temp_file.name)
-                    self.decrypt_file(encrypted_data, temp_path)
+                if self.backend == "faster-whisper":
+                    result = self._transcribe_faster_whisper(audio_file_path)
+                else:
+                    # Wczytanie audio bezpośrednio do pamięci (float32, 16 kHz) - bez kopii na dysku
+                    audio = whisper.load_audio(str(audio_file_path))
+                    
+                    # Pominięcie ciszy przed enkoderem (WHISPER_SILENCE_HANDLING=skip)
+                    offsets = None
+                    if WHISPER_SILENCE_HANDLING == "skip":
+                        if SILERO_VAD_AVAILABLE:
+                            original_length = len(audio)
+                            audio, offsets = self._remove_silence(audio)
+                            logger.info(
+                                f"VAD: pozostawiono {len(audio) / max(original_length, 1):.0%} nagrania (mowa)"
+                            )
+                        else:
+                            logger.warning("silero-vad nie jest zainstalowane - cisza nie zostanie pominięta")
                     
                     # Transkrypcja z modelem large-v3 dla najwyższej dokładności
                     # Parametry zoptymalizowane dla obsługi długich pauz w nagraniach
                     result = self.model.transcribe(
-                        str(temp_path),
+                        audio,
                         language="pl",  # Język polski
                         task="transcribe",
                         fp16=self._fp16 and WHISPER_FP16,
@@ -147,8 +263,10 @@ class WhisperTranscriber:
                         temperature=WHISPER_TEMPERATURE,
                     )
                     
-                    # Usunięcie tymczasowego pliku
-                    temp_path.unlink()
+                    if offsets:
+                        for segment in result.get("segments", []):
+                            segment["start"] = self._restore_timestamp(segment["start"], offsets)
+                            segment["end"] = self._restore_timestamp(segment["end"], offsets, is_end=True)
                 
                 transcribed_text = result["text"].strip()
                 logger.info(f"Transkrypcja zakończona pomyślnie: {audio_file_path.name}")
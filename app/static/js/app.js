@@ -273,6 +273,33 @@ async function refreshQueue() {
     }
 }
 
+function startQueueUpdates() {
+    // Serwer wysyła stan kolejki tylko po zmianie (SSE); EventSource sam wznawia połączenie
+    if (window.EventSource) {
+        const source = new EventSource('/queue.events');
+        source.onmessage = (event) => {
+            try {
+                renderQueue(JSON.parse(event.data).items || []);
+            } catch (err) {
+                console.error('Nieprawidłowe dane kolejki:', err);
+            }
+        };
+        // Serwer odmówił strumienia (limit połączeń) - przejście na odpytywanie
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                startQueuePolling();
+            }
+        };
+        return;
+    }
+    startQueuePolling();
+}
+
+function startQueuePolling() {
+    refreshQueue();
+    setInterval(refreshQueue, 5000);
+}
+
 function renderQueue(items) {
     const queueBody = document.getElementById('queue-body');
     if (!queueBody) return;
@@ -497,8 +524,7 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Start queue refresh if on dashboard
     if (document.getElementById('queue-body')) {
-        refreshQueue();
-        setInterval(refreshQueue, 5000);
+        startQueueUpdates();
     }
 });
 
@@ -733,8 +759,13 @@ async function sendMessage() {
     const originalValue = textarea.value;
     textarea.value = '';
     
+    // Pending messages shown while the model is still generating
+    const pendingUser = { role: 'user', content: message, created_at: new Date().toISOString() };
+    const pendingAssistant = { role: 'assistant', content: '', created_at: new Date().toISOString() };
+    let pendingAdded = false;
+    
     try {
-        const response = await fetch('/api/chat/message', {
+        const response = await fetch('/api/chat/message/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -745,11 +776,59 @@ async function sendMessage() {
             })
         });
         
-        if (!response.ok) throw new Error('Failed to send message');
+        if (!response.ok || !response.body) throw new Error('Failed to send message');
         
-        const data = await response.json();
+        currentConversation.messages.push(pendingUser, pendingAssistant);
+        pendingAdded = true;
+        renderMessages();
+        
+        const historyElement = document.getElementById('chat-history');
+        const contentElements = historyElement
+            ? historyElement.querySelectorAll('.chat-message.assistant .chat-message-content')
+            : [];
+        const assistantContent = contentElements[contentElements.length - 1];
+        
+        // Parse server-sent events from the response stream
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let data = null;
         
-        // Add messages to current conversation
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let eventName = 'message';
+                let eventData = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) eventName = line.slice(7);
+                    else if (line.startsWith('data: ')) eventData += line.slice(6);
+                });
+                if (!eventData) continue;
+                
+                if (eventName === 'token') {
+                    pendingAssistant.content += JSON.parse(eventData).text;
+                    if (assistantContent) {
+                        assistantContent.innerHTML = escapeHtml(pendingAssistant.content).replace(/\n/g, '<br>');
+                        historyElement.scrollTop = historyElement.scrollHeight;
+                    }
+                } else if (eventName === 'done') {
+                    data = JSON.parse(eventData);
+                }
+            }
+        }
+        
+        if (!data) throw new Error('Connection closed before the response completed');
+        
+        // Replace pending messages with the stored ones
+        currentConversation.messages.splice(-2, 2);
+        pendingAdded = false;
         if (data.user_message) {
             currentConversation.messages.push(data.user_message);
         }
@@ -772,6 +851,10 @@ async function sendMessage() {
         }
     } catch (error) {
         console.error('Error sending message:', error);
+        if (pendingAdded) {
+            currentConversation.messages.splice(-2, 2);
+            renderMessages();
+        }
         textarea.value = originalValue; // Restore message
         showToast('Błąd wysyłania wiadomości: ' + error.message, 'error');
     } finally {
@@ -4,18 +4,30 @@ Moduł z prostym interfejsem Flask do dodawania i podglądu plików.
 """
 from __future__ import annotations
 
+import atexit
+import gzip
+import io
+import itertools
 import logging
 import os
+import shutil
 import signal
+import subprocess
 import sys
+import tempfile
 import threading
 import time
-from functools import wraps
+import wave
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from flask import (
     Flask,
+    Request,
     abort,
     flash,
     jsonify,
@@ -24,63 +36,442 @@ from flask import (
     request,
     send_from_directory,
     session,
+    stream_with_context,
     url_for,
 )
+from flask.json.provider import DefaultJSONProvider
+import requests
 from werkzeug.utils import secure_filename
-
-from .audio_processor import AudioProcessor
+from werkzeug.wsgi import FileWrapper
+
+# Opcjonalnie: orjson - szybsza serializacja JSON dla często odpytywanych endpointów
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    import json
+    ORJSON_AVAILABLE = False
+
+# Opcjonalnie: Flask-Compress - kompresja stron i zasobów statycznych (brotli/gzip)
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+
+# Ustawienia zmieniane z panelu (Ollama, hasła) czytane są jako config.X, więc po
+# /settings/reload działają od razu; stałe importowane z config wymagają restartu
+from . import config
+from .audio_preprocessor import preprocess_pcm
 from .config import (
     INPUT_FOLDER,
     OUTPUT_FOLDER,
     WEB_HOST,
-    WEB_LOGIN,
-    WEB_PASSWORD,
     WEB_PORT,
     WEB_SECRET_KEY,
-    SETTINGS_PASSWORD,
-    OLLAMA_BASE_URL,
-    OLLAMA_MODEL,
-    ENABLE_OLLAMA_ANALYSIS,
-    PROMPT_DIR,
+    MAX_CONCURRENT_PROCESSES,
+    STATUS_PROMPT_FILE,
+    SYSTEM_PROMPT_FILE,
+    TRUTHY_VALUES,
+    WEB_SERVER_THREADS,
+    WEB_USE_X_SENDFILE,
 )
 from .file_loader import AudioFileValidator
+from .ollama_analyzer import OllamaAnalyzer
 from .processing_queue import ProcessingQueue, QueueItem
 from .chat_manager import ChatManager
-from .settings_manager import get_settings_manager, SETTINGS_CATEGORIES
+from .settings_manager import (
+    get_cached_settings,
+    get_settings_manager,
+    SETTINGS_CATEGORIES,
+    SETTINGS_DEFINITIONS,
+)
 from .prompt_manager import get_prompt_manager
 
+if TYPE_CHECKING:
+    # Tylko dla adnotacji - moduł ładuje modele Whisper/pyannote, tworzy go web_server
+    from .audio_processor import AudioProcessor
+
 logger = logging.getLogger(__name__)
 
 
-def get_ollama_models() -> List[str]:
-    """Pobiera listę dostępnych modeli Ollama."""
+class OrjsonProvider(DefaultJSONProvider):
+    """Provider JSON dla Flask oparty na orjson (jsonify, request.get_json)
+
+    Obiekty, których orjson nie obsługuje, trafiają do domyślnego providera Flask.
+    """
+
+    _options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS if ORJSON_AVAILABLE else 0
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options).decode("utf-8")
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._options)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# Blok odczytu plików wysyłanych przez serwer bez własnego wsgi.file_wrapper
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _large_chunk_file_wrapper(file, buffer_size: int = 8192) -> FileWrapper:
+    """wsgi.file_wrapper dla serwerów bez sendfile (np. serwer deweloperski): bloki po 1 MB."""
+    return FileWrapper(file, max(buffer_size, DOWNLOAD_CHUNK_SIZE))
+
+
+# Odstęp między komentarzami podtrzymującymi strumień /queue.events
+QUEUE_EVENTS_HEARTBEAT = 15.0  # sekundy
+# Strumień /queue.events zajmuje wątek serwera, więc jest zamykany po QUEUE_EVENTS_MAX_AGE
+# (EventSource łączy się ponownie po QUEUE_EVENTS_RETRY_MS), a liczba jednoczesnych
+# strumieni jest ograniczona - pozostali klienci odpytują /queue.json
+QUEUE_EVENTS_MAX_AGE = 60.0  # sekundy
+QUEUE_EVENTS_RETRY_MS = 5000
+QUEUE_EVENTS_MAX_STREAMS = max(1, WEB_SERVER_THREADS // 4)
+
+TEMPLATE_DIR = str(Path(__file__).parent / "templates")
+STATIC_DIR = str(Path(__file__).parent / "static")
+# Zasoby statyczne z wersją w URL (?v=<mtime>) mogą być trzymane w cache przeglądarki rok
+STATIC_CACHE_MAX_AGE = 365 * 24 * 3600  # sekundy
+
+# Pliki audio testowego (ustawienia -> test preprocessingu); usuwane po TEST_AUDIO_MAX_AGE
+TEST_AUDIO_DIR = Path(tempfile.gettempdir()) / "whisper_test"
+TEST_AUDIO_MAX_AGE = 600.0  # sekundy
+TEST_AUDIO_CLEANUP_INTERVAL = 300.0  # sekundy
+TEST_AUDIO_SAMPLE_RATE = 16000  # Hz, mono
+# Identyfikatory plików testowych: losowy prefiks procesu (unikalny także po restarcie) + licznik
+_TEST_AUDIO_ID_PREFIX = os.urandom(3).hex()
+_test_audio_counter = itertools.count()
+
+
+def _prune_test_audio_dir(max_age: float = TEST_AUDIO_MAX_AGE) -> int:
+    """Usuwa z TEST_AUDIO_DIR pliki starsze niż ``max_age`` sekund; zwraca ich liczbę."""
+    cutoff = time.time() - max_age
+    removed = 0
     try:
-        import requests
-        response = requests.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5)
-        if response.status_code == 200:
-            models = response.json().get("models", [])
-            return [model["name"] for model in models]
-    except Exception as e:
-        logger.warning(f"Nie udało się pobrać listy modeli Ollama: {e}")
-    return []
+        entries = list(os.scandir(TEST_AUDIO_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _start_test_audio_janitor() -> threading.Event:
+    """Uruchamia wątek okresowo czyszczący TEST_AUDIO_DIR; zwraca zdarzenie zatrzymujące."""
+    stop_event = threading.Event()
+
+    def _loop() -> None:
+        while not stop_event.wait(TEST_AUDIO_CLEANUP_INTERVAL):
+            removed = _prune_test_audio_dir()
+            if removed:
+                logger.debug(f"Usunięto {removed} starych plików audio testowego")
+
+    threading.Thread(target=_loop, name="test-audio-janitor", daemon=True).start()
+    return stop_event
+
+
+# Pula procesów dla preprocessingu audio testowego (pydub/numpy poza GIL wątków żądań).
+# Procesy uruchamiane metodą "spawn" - fork wielowątkowego procesu z załadowanymi
+# modelami jest niebezpieczny; pula tworzona przy pierwszym użyciu.
+TEST_AUDIO_POOL_WORKERS = max(1, min(2, (os.cpu_count() or 2) // 2))
+_test_audio_pool: Optional[ProcessPoolExecutor] = None
+_test_audio_pool_lock = threading.Lock()
+
+
+def _get_test_audio_pool() -> ProcessPoolExecutor:
+    global _test_audio_pool
+    with _test_audio_pool_lock:
+        if _test_audio_pool is None:
+            _test_audio_pool = ProcessPoolExecutor(
+                max_workers=TEST_AUDIO_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_test_audio_pool.shutdown, wait=False)
+        return _test_audio_pool
+
+
+def _submit_test_audio_preprocess(
+    pcm: bytes, output_path: Path, options: Dict[str, object], fallback_path: Path
+) -> Future:
+    """Zleca preprocessing puli procesów; wynik future: True, jeśli zapisano ``output_path``
+    (False - nieprzetworzone próbki zapisano w ``fallback_path``).
+
+    Po awarii puli (BrokenProcessPool) kolejne wywołanie tworzy ją od nowa.
+    """
+    global _test_audio_pool
+
+    def _drop_broken_pool(pool: ProcessPoolExecutor) -> None:
+        global _test_audio_pool
+        with _test_audio_pool_lock:
+            if _test_audio_pool is pool:
+                _test_audio_pool = None
+
+    pool = _get_test_audio_pool()
+    try:
+        future = pool.submit(
+            preprocess_pcm, pcm, TEST_AUDIO_SAMPLE_RATE, str(output_path), options, str(fallback_path)
+        )
+    except BrokenProcessPool:
+        _drop_broken_pool(pool)
+        raise
+    future.add_done_callback(
+        lambda f: isinstance(f.exception(), BrokenProcessPool) and _drop_broken_pool(pool)
+    )
+    return future
+
+
+# Cache listy modeli Ollama (TTL) i współdzielona sesja HTTP (keep-alive)
+OLLAMA_MODELS_CACHE_TTL = 30.0  # sekundy
+# Nieudane pobranie też jest pamiętane (krócej) - niedostępna Ollama nie blokuje każdego żądania
+OLLAMA_MODELS_FAILURE_TTL = 5.0  # sekundy
+OLLAMA_MODELS_TIMEOUT = 2.0  # sekundy; /api/tags zdrowej Ollamy odpowiada natychmiast
+_ollama_models_cache: Dict[str, object] = {"time": 0.0, "ttl": 0.0, "models": []}
+_ollama_models_lock = threading.Lock()
+_ollama_session = None
+
+
+def _get_ollama_session():
+    """Zwraca współdzieloną sesję requests do API Ollama."""
+    global _ollama_session
+    if _ollama_session is None:
+        _ollama_session = requests.Session()
+    return _ollama_session
+
+
+def invalidate_ollama_models_cache() -> None:
+    """Wymusza ponowne pobranie listy modeli Ollama przy następnym wywołaniu."""
+    with _ollama_models_lock:
+        _ollama_models_cache["time"] = 0.0
+        _ollama_models_cache["ttl"] = 0.0
+
+
+def get_ollama_models() -> List[str]:
+    """Pobiera listę dostępnych modeli Ollama (wynik cache'owany przez OLLAMA_MODELS_CACHE_TTL)."""
+    with _ollama_models_lock:
+        if time.monotonic() - _ollama_models_cache["time"] < _ollama_models_cache["ttl"]:
+            return list(_ollama_models_cache["models"])
+        models: List[str] = []
+        ttl = OLLAMA_MODELS_FAILURE_TTL
+        try:
+            response = _get_ollama_session().get(
+                f"{config.OLLAMA_BASE_URL}/api/tags", timeout=OLLAMA_MODELS_TIMEOUT
+            )
+            if response.status_code == 200:
+                models = [model["name"] for model in response.json().get("models", [])]
+                ttl = OLLAMA_MODELS_CACHE_TTL
+        except Exception as e:
+            logger.warning(f"Nie udało się pobrać listy modeli Ollama: {e}")
+        _ollama_models_cache["models"] = models
+        _ollama_models_cache["time"] = time.monotonic()
+        _ollama_models_cache["ttl"] = ttl
+        return list(models)
 
 
 def check_ollama_model_available() -> tuple[bool, str]:
     """Sprawdza czy wybrany model Ollama jest dostępny."""
-    if not ENABLE_OLLAMA_ANALYSIS:
+    if not config.ENABLE_OLLAMA_ANALYSIS:
         return True, ""  # Analiza wyłączona - OK
     
     available_models = get_ollama_models()
     if not available_models:
         return False, "Nie można połączyć się z serwerem Ollama"
     
-    if OLLAMA_MODEL not in available_models:
-        return False, f"Model '{OLLAMA_MODEL}' nie jest dostępny. Dostępne: {', '.join(available_models)}"
+    if config.OLLAMA_MODEL not in available_models:
+        return False, f"Model '{config.OLLAMA_MODEL}' nie jest dostępny. Dostępne: {', '.join(available_models)}"
     
     return True, ""
 
-# Flaga do restartu systemu
-_restart_requested = False
+
+@lru_cache(maxsize=64)
+def _read_text_cached(path_str: str, mtime_ns: int, size: int) -> str:
+    """Odczyt pliku tekstowego z cache - klucz zawiera mtime i rozmiar, więc zmiana pliku unieważnia wpis."""
+    return Path(path_str).read_text(encoding="utf-8")
+
+
+def _read_result_text(path: Path) -> str:
+    """Odczytuje plik wynikowy (transkrypcja/analiza), korzystając z cache dla niezmienionych plików."""
+    stat = path.stat()
+    return _read_text_cached(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+def _read_prompt_file(path: Path) -> str:
+    """Odczytuje plik promptu przez cache (jeden stat na wywołanie); brak pliku daje pusty tekst."""
+    try:
+        return _read_result_text(path)
+    except FileNotFoundError:
+        return ""
+
+
+def _write_text_atomic(path: Path, content: str) -> None:
+    """Zapis pliku tekstowego przez plik tymczasowy i os.replace - czytelnik nigdy nie widzi połowy treści."""
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as tmp:
+        tmp.write(content)
+    try:
+        os.chmod(tmp.name, 0o644)
+        os.replace(tmp.name, path)
+    except OSError:
+        Path(tmp.name).unlink(missing_ok=True)
+        raise
+
+
+def _read_trimmed_pcm(source: str, max_seconds: int) -> bytes:
+    """Zwraca pierwsze ``max_seconds`` nagrania jako PCM s16le 16 kHz mono (bez plików pośrednich).
+
+    16 kHz mono to format, na którym i tak pracuje Whisper - mniej danych przyspiesza
+    preprocessing. WAV/PCM już w tym formacie czyta moduł wave; inne pliki dekoduje
+    jedno wywołanie ffmpeg (tylko potrzebny fragment, wynik przez potok). Bez ffmpeg
+    w PATH - dekodowanie całego pliku przez pydub.
+    """
+    try:
+        with wave.open(source, "rb") as src:
+            if (
+                src.getnchannels() == 1
+                and src.getsampwidth() == 2
+                and src.getframerate() == TEST_AUDIO_SAMPLE_RATE
+            ):
+                return src.readframes(min(src.getnframes(), max_seconds * TEST_AUDIO_SAMPLE_RATE))
+    except (wave.Error, EOFError):
+        pass
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        result = subprocess.run(
+            [ffmpeg, "-nostdin", "-v", "error", "-t", str(max_seconds), "-i", source,
+             "-ac", "1", "-ar", str(TEST_AUDIO_SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+            check=True,
+            capture_output=True,
+        )
+        return result.stdout
+
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(source)[: max_seconds * 1000]
+    return audio.set_frame_rate(TEST_AUDIO_SAMPLE_RATE).set_channels(1).set_sample_width(2).raw_data
+
+
+def _ensure_gzip_copy(path: Path) -> Path:
+    """Zwraca skompresowaną kopię pliku (``<nazwa>.gz``), tworząc ją przy pierwszym użyciu."""
+    gz_path = path.with_name(path.name + ".gz")
+    if not gz_path.is_file():
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".gz.tmp", delete=False) as tmp:
+            with open(path, "rb") as src, gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst)
+        os.replace(tmp.name, gz_path)
+    return gz_path
+
+
+def _write_pcm_wav(target: Path, pcm: bytes) -> None:
+    """Zapisuje PCM s16le 16 kHz mono jako plik WAV."""
+    with wave.open(str(target), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(TEST_AUDIO_SAMPLE_RATE)
+        wav.writeframes(pcm)
+
+
+# Wątki dekodujące audio testowe (ffmpeg w podprocesie) - żądanie HTTP tylko zleca pracę
+_test_audio_executor = ThreadPoolExecutor(
+    max_workers=TEST_AUDIO_POOL_WORKERS, thread_name_prefix="test-audio"
+)
+atexit.register(_test_audio_executor.shutdown, wait=False)
+
+
+def _run_test_audio_job(
+    source: Path, file_id: str, options: Optional[Dict[str, object]]
+) -> Tuple[int, bool]:
+    """Przycina nagranie (max 30 s) i przetwarza je; zwraca (długość w ms, czy przetworzono).
+
+    Plik źródłowy jest usuwany po zdekodowaniu. Bez ``options`` zapisywany jest
+    tylko przycięty oryginał.
+    """
+    try:
+        pcm = _read_trimmed_pcm(str(source), 30)
+    finally:
+        source.unlink(missing_ok=True)
+    duration_ms = len(pcm) // 2 * 1000 // TEST_AUDIO_SAMPLE_RATE
+
+    trimmed_path = TEST_AUDIO_DIR / f"trimmed_{file_id}.wav"
+    if options is None:
+        _write_pcm_wav(trimmed_path, pcm)
+        return duration_ms, False
+
+    # Obliczenia w puli procesów; gdy przetworzenie nie jest możliwe,
+    # do odsłuchu trafia przycięty oryginał
+    future = _submit_test_audio_preprocess(
+        pcm, TEST_AUDIO_DIR / f"processed_{file_id}.wav", options, trimmed_path
+    )
+    return duration_ms, bool(future.result())
+
+
+def _build_chat_prompt_prefix(filename: str, transcription: str, analysis: str) -> str:
+    """Stała część promptu czatu (instrukcja + kontekst rozmowy).
+
+    Bez cache - kluczem byłaby cała transkrypcja, a prefiks i tak budowany jest
+    tylko w pierwszej turze (kolejne korzystają z kontekstu Ollama).
+    """
+    prompt_parts = []
+    
+    prompt_parts.append("Jesteś ekspertem analizującym rozmowy telefoniczne. Odpowiadasz po polsku.")
+    
+    if filename:
+        prompt_parts.append(f"Nazwa pliku: {filename}")
+    
+    if transcription:
+        prompt_parts.append("\nTranskrypcja rozmowy:\n" + transcription)
+    
+    if analysis:
+        prompt_parts.append("\nAnaliza rozmowy:\n" + analysis)
+    
+    return "\n\n".join(prompt_parts)
+
+
+# Klucze ustawień wymagające specjalnej obsługi w formularzu (liczone raz przy imporcie)
+_BOOLEAN_SETTING_KEYS = frozenset(
+    key for key, definition in SETTINGS_DEFINITIONS.items() if definition.get("type") == "boolean"
+)
+_PASSWORD_SETTING_KEYS = frozenset(
+    key for key, definition in SETTINGS_DEFINITIONS.items() if definition.get("type") == "password_change"
+)
+
+
+# Wybór przetwarzania oryginału: (wymuszony oryginał, preprocessing włączony, wybór użytkownika)
+# -> (przetwarzaj oryginał, powód)
+PREPROCESS_CHOICES: Dict[tuple, tuple] = {
+    (force_original, preprocess_enabled, form_choice): (
+        (True, "force_original_setting") if force_original
+        else (True, "preprocess_disabled_setting") if not preprocess_enabled
+        else (True, "user_choice_process_original") if form_choice
+        else (False, "user_choice_preprocess")
+    )
+    for force_original in (True, False)
+    for preprocess_enabled in (True, False)
+    for form_choice in (True, False)
+}
+
+# Żądanie restartu systemu (Event - bezpieczny odczyt z innych wątków, możliwe wait())
+_restart_event = threading.Event()
 
 
 def create_web_app(
@@ -97,13 +488,87 @@ def create_web_app(
 
     app = Flask(
         __name__,
-        template_folder=str(Path(__file__).parent / "templates"),
-        static_folder=str(Path(__file__).parent / "static"),
+        template_folder=TEMPLATE_DIR,
+        static_folder=STATIC_DIR,
     )
     app.config["SECRET_KEY"] = WEB_SECRET_KEY
+    # Szablony nie zmieniają się w trakcie działania - bez sprawdzania mtime przy renderowaniu
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    # Za serwerem z X-Sendfile plik wysyła serwer frontowy (bez kopiowania przez Pythona)
+    app.config["USE_X_SENDFILE"] = WEB_USE_X_SENDFILE
+    if ORJSON_AVAILABLE:
+        app.json = OrjsonProvider(app)
+    if COMPRESS_AVAILABLE:
+        # Tylko HTML/CSS/JS - JSON (ETag/304 /queue.json), strumienie SSE i pliki audio bez zmian
+        app.config.update(
+            COMPRESS_ALGORITHM=["br", "gzip"],
+            COMPRESS_MIMETYPES=["text/html", "text/css", "text/javascript", "application/javascript"],
+            COMPRESS_MIN_SIZE=512,
+        )
+        Compress(app)
 
     target_input = Path(input_folder or INPUT_FOLDER)
     target_input.mkdir(parents=True, exist_ok=True)
+    # Katalog na częściowo odebrane uploady (ten sam system plików co input -> rename zamiast kopii)
+    upload_tmp_dir = target_input / ".uploads"
+    upload_tmp_dir.mkdir(parents=True, exist_ok=True)
+    # Ścieżka absolutna jako str - tempfile zwraca absolutne nazwy plików .part
+    upload_tmp_dir_str = os.path.abspath(upload_tmp_dir)
+
+    class _DiscardedUpload(io.RawIOBase):
+        """Strumień pomijający treść pliku, który i tak zostanie odrzucony"""
+
+        def writable(self) -> bool:
+            return True
+
+        def seekable(self) -> bool:
+            return True
+
+        def write(self, data) -> int:
+            return len(data)
+
+        def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+            return 0
+
+    class _StreamingUploadRequest(Request):
+        """Request zapisujący przesyłane pliki od razu na dysk, blokami po 1 MB"""
+
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            # Pliki o nieobsługiwanym rozszerzeniu w /upload odrzucamy już przy nagłówku
+            # części - ich treść nie trafia na dysk
+            if self.endpoint == "upload":
+                suffix = os.path.splitext(secure_filename(filename or ""))[1].lower()
+                if suffix not in allowed_suffixes:
+                    return _DiscardedUpload()
+            part_file = tempfile.NamedTemporaryFile(
+                "wb+",
+                dir=upload_tmp_dir,
+                prefix="upload_",
+                suffix=".part",
+                delete=False,
+                buffering=1024 * 1024,
+            )
+            if not hasattr(self, "_upload_parts"):
+                self._upload_parts = []
+            self._upload_parts.append(part_file)
+            return part_file
+
+    app.request_class = _StreamingUploadRequest
+
+    @app.before_request
+    def _use_large_file_chunks():
+        # gunicorn dostarcza własny wrapper (sendfile) - podmieniamy tylko jego brak
+        environ = request.environ
+        if "wsgi.file_wrapper" not in environ:
+            environ["wsgi.file_wrapper"] = _large_chunk_file_wrapper
+
+    @app.teardown_request
+    def _cleanup_upload_parts(exc=None):
+        """Usuwa pliki .part, które nie zostały przeniesione do folderu wejściowego."""
+        for part_file in getattr(request, "_upload_parts", []):
+            part_file.close()
+            Path(part_file.name).unlink(missing_ok=True)
+
     target_output = Path(output_folder or OUTPUT_FOLDER)
     target_output.mkdir(parents=True, exist_ok=True)
 
@@ -111,6 +576,8 @@ def create_web_app(
         AudioFileValidator.SUPPORTED_EXTENSIONS
     )
     accept_attribute = ",".join(allowed_extensions)
+    allowed_suffixes = frozenset(AudioFileValidator.SUPPORTED_EXTENSIONS)
+    allowed_extensions_no_dot = tuple(ext.lstrip(".") for ext in allowed_extensions)
 
     status_labels: Dict[str, str] = {
         "queued": "Oczekuje",
@@ -128,35 +595,86 @@ def create_web_app(
         "preprocessor_unavailable": "Preprocessor niedostępny",
     }
 
+    # Stała część kontekstu szablonu dashboard (nie zależy od żądania)
+    dashboard_static_context = {
+        "accept_attribute": accept_attribute,
+        "allowed_extensions": allowed_extensions,
+        "preprocess_reason_labels": preprocess_reason_labels,
+    }
+
     chat_manager = ChatManager()
 
-    def login_required(view):
-        @wraps(view)
-        def wrapped(*args, **kwargs):
-            if not session.get("authenticated"):
-                return redirect(url_for("login", next=request.path))
-            return view(*args, **kwargs)
+    # Stała pula wątków do przetwarzania plików - ogranicza liczbę równoległych zadań
+    processing_executor = ThreadPoolExecutor(
+        max_workers=max(1, MAX_CONCURRENT_PROCESSES),
+        thread_name_prefix="processing",
+    )
+    atexit.register(processing_executor.shutdown, wait=False)
+    # AudioProcessor powiązany z tą samą kolejką sam zapisuje przejścia stanu zadania
+    # (processing/completed/failed) - worker nie powtarza tych zapisów
+    processor_updates_queue = getattr(processor, "processing_queue", None) is processing_queue
+
+    # Katalog audio testowego tworzony raz; stare pliki sprząta wątek w tle
+    TEST_AUDIO_DIR.mkdir(exist_ok=True)
+    _prune_test_audio_dir()
+    atexit.register(_start_test_audio_janitor().set)
+
+    # Endpointy dostępne bez logowania; pozostałe chroni jeden hook before_request
+    public_endpoints = frozenset({"login", "static"})
+
+    @app.before_request
+    def require_login():
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in public_endpoints:
+            return None
+        if not session.get("authenticated"):
+            return redirect(url_for("login", next=request.path))
+        return None
+
+    # Cache instancji OllamaAnalyzer (z sesją HTTP) - odtwarzane tylko po zmianie ustawień
+    analyzer_cache: Dict[str, Dict[str, object]] = {
+        "chat": {"key": None, "analyzer": None},
+        "analysis": {"key": None, "analyzer": None},
+    }
 
-        return wrapped
+    def _invalidate_ollama_analyzers() -> None:
+        for entry in analyzer_cache.values():
+            entry["key"] = None
+            entry["analyzer"] = None
 
     def _get_ollama_analyzer(chat_mode: bool = False):
-        """Tworzy instancję OllamaAnalyzer z ustawieniami z konfiguracji."""
-        from .ollama_analyzer import OllamaAnalyzer
-        
+        """Zwraca (współdzieloną) instancję OllamaAnalyzer z ustawieniami z konfiguracji."""
         if chat_mode:
-            # Pobierz ustawienia czatu
-            settings_manager = get_settings_manager()
-            chat_model = settings_manager.get_setting("CHAT_OLLAMA_MODEL") or OLLAMA_MODEL
+            # Pobierz ustawienia czatu (jeden odczyt pliku .env)
+            settings = get_settings_manager().get_all_settings()
+
+            def _value(key: str, default: str) -> str:
+                return settings.get(key, {}).get("value") or default
+
+            chat_model = _value("CHAT_OLLAMA_MODEL", config.OLLAMA_MODEL)
             chat_params = {
-                "temperature": float(settings_manager.get_setting("CHAT_OLLAMA_TEMPERATURE") or "0.7"),
-                "top_p": float(settings_manager.get_setting("CHAT_OLLAMA_TOP_P") or "0.9"),
-                "top_k": int(settings_manager.get_setting("CHAT_OLLAMA_TOP_K") or "40"),
-                "num_ctx": int(settings_manager.get_setting("CHAT_OLLAMA_NUM_CTX") or "2048"),
-                "num_predict": int(settings_manager.get_setting("CHAT_OLLAMA_NUM_PREDICT") or "512"),
+                "temperature": float(_value("CHAT_OLLAMA_TEMPERATURE", "0.7")),
+                "top_p": float(_value("CHAT_OLLAMA_TOP_P", "0.9")),
+                "top_k": int(_value("CHAT_OLLAMA_TOP_K", "40")),
+                "num_ctx": int(_value("CHAT_OLLAMA_NUM_CTX", "2048")),
+                "num_predict": int(_value("CHAT_OLLAMA_NUM_PREDICT", "512")),
             }
-            return OllamaAnalyzer(base_url=OLLAMA_BASE_URL, model=chat_model, chat_params=chat_params)
+            cache_entry = analyzer_cache["chat"]
+            key = (config.OLLAMA_BASE_URL, chat_model, tuple(sorted(chat_params.items())))
+            if cache_entry["key"] != key:
+                cache_entry["analyzer"] = OllamaAnalyzer(
+                    base_url=config.OLLAMA_BASE_URL, model=chat_model, chat_params=chat_params
+                )
+                cache_entry["key"] = key
         else:
-            return OllamaAnalyzer(base_url=OLLAMA_BASE_URL, model=OLLAMA_MODEL)
+            cache_entry = analyzer_cache["analysis"]
+            key = (config.OLLAMA_BASE_URL, config.OLLAMA_MODEL)
+            if cache_entry["key"] != key:
+                cache_entry["analyzer"] = OllamaAnalyzer(
+                    base_url=config.OLLAMA_BASE_URL, model=config.OLLAMA_MODEL
+                )
+                cache_entry["key"] = key
+        return cache_entry["analyzer"]
 
     def _start_processing(
         queue_item: QueueItem,
@@ -169,7 +687,8 @@ def create_web_app(
 
         def _worker():
             try:
-                processing_queue.mark_processing(queue_item.id)
+                if not processor_updates_queue:
+                    processing_queue.mark_processing(queue_item.id)
                 result = processor.process_audio_file(
                     queue_item.input_path,
                     queue_item_id=queue_item.id,
@@ -177,6 +696,8 @@ def create_web_app(
                     preprocess_requested=preprocess_requested,
                     preprocess_reason=preprocess_reason,
                 )
+                if processor_updates_queue:
+                    return
                 if result.get("success"):
                     manual_files: Dict[str, str] = {}
                     transcription_file = result.get("transcription_file")
@@ -205,42 +726,94 @@ def create_web_app(
                 processing_queue.mark_failed(queue_item.id, str(exc))
 
         if asynchronous:
-            threading.Thread(target=_worker, daemon=True).start()
+            processing_executor.submit(_worker)
         else:
             _worker()
 
+    # Zadania, które czekały w kolejce w chwili zatrzymania aplikacji, wracają do puli
+    if asynchronous:
+        for queue_item in processing_queue.queued_items():
+            if not queue_item.input_path.exists():
+                processing_queue.mark_failed(queue_item.id, "Brak pliku wejściowego po restarcie")
+                continue
+            logger.info("Wznawiam zadanie z kolejki: %s", queue_item.filename)
+            _start_processing(
+                queue_item,
+                enable_preprocessing=queue_item.preprocess_requested,
+                preprocess_requested=queue_item.preprocess_requested,
+                preprocess_reason=queue_item.preprocess_reason,
+            )
+
     def _save_file(storage, destination_dir: Path) -> Optional[Path]:
         filename = secure_filename(storage.filename or "")
         if not filename:
             return None
 
-        suffix = Path(filename).suffix.lower()
-        if suffix not in AudioFileValidator.SUPPORTED_EXTENSIONS:
+        stem, suffix = os.path.splitext(filename)
+        suffix = suffix.lower()
+        if suffix not in allowed_suffixes:
             return None
 
-        destination_dir.mkdir(parents=True, exist_ok=True)
-        candidate = destination_dir / filename
-        counter = 1
-        while candidate.exists():
-            candidate = destination_dir / f"{Path(filename).stem}_{counter}{suffix}"
-            counter += 1
-
-        storage.save(candidate)
-        return candidate
+        # Katalog docelowy tworzy create_web_app (zawiera też .uploads z plikami .part).
+        # Atomowa rezerwacja nazwy (O_EXCL) - bez sondowania kolejnych nazw i bez wyścigu
+        # dwóch równoczesnych uploadów o tej samej nazwie
+        candidate = os.path.join(destination_dir, filename)
+        try:
+            os.close(os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        except FileExistsError:
+            with tempfile.NamedTemporaryFile(
+                prefix=f"{stem}_",
+                suffix=suffix,
+                dir=destination_dir,
+                delete=False,
+            ) as reserved:
+                candidate = reserved.name
+
+        # Upload już zapisany strumieniowo do .part - wystarczy przenieść plik
+        part_name = getattr(storage.stream, "name", None)
+        if isinstance(part_name, str) and os.path.dirname(part_name) == upload_tmp_dir_str:
+            storage.stream.close()
+            os.replace(part_name, candidate)
+        else:
+            storage.save(candidate, buffer_size=1024 * 1024)
+        # Pliki tymczasowe mają prawa 0600 - przywracamy standardowe uprawnienia uploadu
+        os.chmod(candidate, 0o644)
+        return Path(candidate)
 
-    @app.context_processor
-    def inject_globals():
-        return {
-            "status_labels": status_labels,
-            "allowed_extensions": [ext.lstrip(".") for ext in allowed_extensions],
-        }
+    @lru_cache(maxsize=64)
+    def _static_version(filename: str) -> str:
+        try:
+            return str(int(os.stat(os.path.join(STATIC_DIR, filename)).st_mtime))
+        except OSError:
+            return ""
+
+    @app.url_defaults
+    def _versioned_static_urls(endpoint, values):
+        """Dodaje ?v=<mtime> do adresów zasobów statycznych - nowa wersja pliku to nowy URL."""
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            version = _static_version(values["filename"])
+            if version:
+                values["v"] = version
+
+    @app.after_request
+    def _cache_versioned_static(response):
+        if request.endpoint == "static" and "v" in request.args and response.status_code == 200:
+            response.headers["Cache-Control"] = f"public, max-age={STATIC_CACHE_MAX_AGE}, immutable"
+        return response
+
+    # Stałe wartości dla wszystkich szablonów - rejestrowane raz jako globalne Jinja,
+    # bez context processora wywoływanego przy każdym renderowaniu
+    app.jinja_env.globals.update(
+        status_labels=status_labels,
+        allowed_extensions=allowed_extensions_no_dot,
+    )
 
     @app.route("/login", methods=["GET", "POST"])
     def login():
         if request.method == "POST":
             username = request.form.get("username", "").strip()
             password = request.form.get("password", "")
-            if username == WEB_LOGIN and password == WEB_PASSWORD:
+            if username == config.WEB_LOGIN and password == config.WEB_PASSWORD:
                 session["authenticated"] = True
                 flash("Zalogowano pomyślnie.", "success")
                 return redirect(request.args.get("next") or url_for("dashboard"))
@@ -248,27 +821,36 @@ def create_web_app(
         return render_template("login.html")
 
     @app.route("/logout")
-    @login_required
     def logout():
         session.clear()
         flash("Wylogowano.", "info")
         return redirect(url_for("login"))
 
+    # Zserializowana kolejka (wersja, elementy, JSON) - /queue.json jest odpytywany co kilka
+    # sekund z każdej karty; serializacja tylko po zmianie stanu kolejki
+    queue_snapshot_cache: Dict[str, tuple] = {"snapshot": (None, [], b"")}
+
+    def _queue_snapshot() -> tuple:
+        snapshot = queue_snapshot_cache["snapshot"]
+        if snapshot[0] == processing_queue.version:
+            return snapshot
+        version, items = processing_queue.serialize_versioned()
+        if ORJSON_AVAILABLE:
+            body = orjson.dumps({"items": items})
+        else:
+            body = json.dumps({"items": items}, ensure_ascii=False).encode("utf-8")
+        # Jedno przypisanie krotki - równoległe żądania widzą spójną wersję i treść
+        snapshot = queue_snapshot_cache["snapshot"] = (version, items, body)
+        return snapshot
+
     @app.route("/")
-    @login_required
     def dashboard():
-        queue_items = processing_queue.serialize()
-        # Pobierz retencję z ustawień
-        settings_manager = get_settings_manager()
-        retention_days = settings_manager.get_setting("FILE_RETENTION_DAYS") or "90"
-        force_original_setting = (
-            (settings_manager.get_setting("AUDIO_FORCE_ORIGINAL") or "false").lower()
-            == "true"
-        )
-        preprocess_default_enabled = (
-            (settings_manager.get_setting("AUDIO_PREPROCESS_ENABLED") or "true").lower()
-            == "true"
-        )
+        _, queue_items, _ = _queue_snapshot()
+        # Sparsowane ustawienia (retencja, preprocessing) z cache
+        request_settings = get_cached_settings().snapshot()
+        retention_days = request_settings.retention_days
+        force_original_setting = request_settings.force_original
+        preprocess_default_enabled = request_settings.preprocess_enabled
         saved_choice = session.get("process_original_choice")
         if saved_choice is None:
             process_original_selected = not preprocess_default_enabled
@@ -279,48 +861,28 @@ def create_web_app(
         return render_template(
             "dashboard.html",
             queue_items=queue_items,
-            accept_attribute=accept_attribute,
-            allowed_extensions=list(AudioFileValidator.SUPPORTED_EXTENSIONS),
             retention_days=retention_days,
             preprocess_force_original=force_original_setting,
             process_original_selected=process_original_selected,
             preprocess_default_enabled=preprocess_default_enabled,
-            preprocess_reason_labels=preprocess_reason_labels,
+            **dashboard_static_context,
         )
 
     @app.route("/upload", methods=["POST"])
-    @login_required
     def upload():
         files = request.files.getlist("files")
         if not files or all(not file.filename for file in files):
             flash("Nie wybrano żadnych plików.", "error")
             return redirect(url_for("dashboard"))
 
-        # Sprawdź dostępność modelu Ollama przed przetwarzaniem
-        model_available, model_error = check_ollama_model_available()
-        settings_manager = get_settings_manager()
-        force_original_setting = (
-            (settings_manager.get_setting("AUDIO_FORCE_ORIGINAL") or "false").lower()
-            == "true"
-        )
-        preprocess_default_enabled = (
-            (settings_manager.get_setting("AUDIO_PREPROCESS_ENABLED") or "true").lower()
-            == "true"
-        )
+        request_settings = get_cached_settings().snapshot()
+        force_original_setting = request_settings.force_original
+        preprocess_default_enabled = request_settings.preprocess_enabled
         process_original_form = request.form.get("process_original") == "1"
 
-        if force_original_setting:
-            process_original_selected = True
-            preprocess_reason = "force_original_setting"
-        elif not preprocess_default_enabled:
-            process_original_selected = True
-            preprocess_reason = "preprocess_disabled_setting"
-        elif process_original_form:
-            process_original_selected = True
-            preprocess_reason = "user_choice_process_original"
-        else:
-            process_original_selected = False
-            preprocess_reason = "user_choice_preprocess"
+        process_original_selected, preprocess_reason = PREPROCESS_CHOICES[
+            (force_original_setting, preprocess_default_enabled, process_original_form)
+        ]
 
         if not force_original_setting and preprocess_default_enabled:
             session["process_original_choice"] = "1" if process_original_selected else "0"
@@ -333,30 +895,45 @@ def create_web_app(
         elif preprocess_requested and preprocess_reason is None:
             preprocess_reason = "default_preprocess"
 
-        saved_items: List[QueueItem] = []
+        saved_paths: List[Path] = []
         rejected: List[str] = []
+        # Lokalne powiązania dla pętli po plikach (wiele plików na żądanie)
+        save_file = _save_file
+        add_saved = saved_paths.append
+        add_rejected = rejected.append
+        input_dir = target_input
 
         for storage in files:
-            saved_path = _save_file(storage, target_input)
+            saved_path = save_file(storage, input_dir)
             if not saved_path:
-                rejected.append(storage.filename or "bez_nazwy")
+                add_rejected(storage.filename or "bez_nazwy")
                 continue
+            add_saved(saved_path)
+
+        # Sprawdź dostępność modelu Ollama przed przetwarzaniem (tylko gdy analiza
+        # jest włączona i jest co przetwarzać)
+        if config.ENABLE_OLLAMA_ANALYSIS and saved_paths:
+            model_available, model_error = check_ollama_model_available()
+        else:
+            model_available, model_error = True, ""
+
+        # Jedna operacja na kolejce dla całej paczki plików
+        saved_items: List[QueueItem] = processing_queue.enqueue_batch(
+            saved_paths,
+            preprocess_requested=preprocess_requested,
+            preprocess_reason=preprocess_reason,
+        )
 
-            queue_item = processing_queue.enqueue(
-                saved_path,
-                preprocess_requested=preprocess_requested,
-                preprocess_reason=preprocess_reason,
+        # Jeśli model niedostępny, oznacz jako błąd
+        if not model_available:
+            processing_queue.mark_failed_many(
+                [queue_item.id for queue_item in saved_items],
+                f"BRAK MODELU ANALIZY: {model_error}",
             )
-            saved_items.append(queue_item)
-            
-            # Jeśli model niedostępny, oznacz jako błąd
-            if not model_available:
-                processing_queue.mark_failed(
-                    queue_item.id, 
-                    f"BRAK MODELU ANALIZY: {model_error}"
-                )
-            else:
-                _start_processing(
+        else:
+            start_processing = _start_processing
+            for queue_item in saved_items:
+                start_processing(
                     queue_item,
                     enable_preprocessing=enable_preprocessing,
                     preprocess_requested=preprocess_requested,
@@ -382,17 +959,70 @@ def create_web_app(
 
         return redirect(url_for("dashboard"))
 
+    # Prefiks ETag unikalny dla procesu - wersje kolejki liczone są od zera po restarcie
+    queue_etag_prefix = f'W/"{os.urandom(4).hex()}-'
+
     @app.route("/queue.json")
-    @login_required
     def queue_json():
-        return jsonify({"items": processing_queue.serialize()})
+        response_class = app.response_class
+        etag = f'{queue_etag_prefix}{processing_queue.version}"'
+        if request.headers.get("If-None-Match") == etag:
+            response = response_class(status=304)
+        else:
+            version, _, body = _queue_snapshot()
+            etag = f'{queue_etag_prefix}{version}"'
+            response = response_class(body, mimetype="application/json")
+        headers = response.headers
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+        return response
+
+    queue_events_slots = threading.BoundedSemaphore(QUEUE_EVENTS_MAX_STREAMS)
+
+    @app.route("/queue.events")
+    def queue_events():
+        """Strumień SSE stanu kolejki - zdarzenie tylko po zmianie (zamiast odpytywania /queue.json).
+
+        Przy wyczerpanym limicie strumieni zwraca 204 - EventSource nie wznawia wtedy
+        połączenia, a strona przechodzi na odpytywanie /queue.json.
+        """
+        if not queue_events_slots.acquire(blocking=False):
+            return "", 204
+
+        def generate():
+            yield f"retry: {QUEUE_EVENTS_RETRY_MS}\n\n".encode()
+            deadline = time.monotonic() + QUEUE_EVENTS_MAX_AGE
+            version = None
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Zamknięcie zwalnia wątek; klient połączy się ponownie po "retry"
+                    return
+                if version is not None and processing_queue.wait_for_change(
+                    version, min(QUEUE_EVENTS_HEARTBEAT, remaining)
+                ) == version:
+                    # Komentarz SSE podtrzymuje połączenie i wykrywa rozłączonych klientów
+                    yield b": ping\n\n"
+                    continue
+                version, _, body = _queue_snapshot()
+                yield b"data: " + body + b"\n\n"
+
+        response = app.response_class(
+            stream_with_context(generate()), mimetype="text/event-stream"
+        )
+        response.call_on_close(queue_events_slots.release)
+        response.headers["Cache-Control"] = "no-cache"
+        # Wyłącz buforowanie odpowiedzi w reverse proxy (nginx)
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
 
     @app.route("/api/ollama-models")
-    @login_required
     def api_ollama_models():
-        """Zwraca listę dostępnych modeli Ollama."""
+        """Zwraca listę dostępnych modeli Ollama (?refresh=1 pomija cache)."""
+        if request.args.get("refresh") == "1":
+            invalidate_ollama_models_cache()
         models = get_ollama_models()
-        current_model = OLLAMA_MODEL
+        current_model = config.OLLAMA_MODEL
         return jsonify({
             "models": models,
             "current": current_model,
@@ -400,7 +1030,6 @@ def create_web_app(
         })
 
     @app.route("/download/<queue_id>/<file_type>")
-    @login_required
     def download_result(queue_id: str, file_type: str):
         file_name = processing_queue.get_result_file(queue_id, file_type)
         if not file_name:
@@ -413,21 +1042,31 @@ def create_web_app(
         else:
             abort(404)
 
-        return send_from_directory(directory, file_name, as_attachment=True)
+        # Odtwarzacz audio (?inline=1) potrzebuje odpowiedzi inline; Range/ETag pozwalają
+        # przeglądarce pobierać tylko brakujące fragmenty przy przewijaniu i ponowieniach
+        inline = file_type == "processed_audio" and request.args.get("inline") == "1"
+        response = send_from_directory(
+            directory,
+            file_name,
+            as_attachment=not inline,
+            conditional=True,
+            etag=True,
+            max_age=0,
+        )
+        response.headers["Cache-Control"] = "private, max-age=0, must-revalidate"
+        return response
 
     # ===========================================
     # CZAT "POROZMAWIAJMY"
     # ===========================================
     
     @app.route("/api/chat/conversations")
-    @login_required
     def api_chat_conversations():
         """Zwraca listę konwersacji czatu."""
         conversations = chat_manager.list_conversations()
         return jsonify({"conversations": conversations})
     
     @app.route("/api/chat/conversation/<conversation_id>")
-    @login_required
     def api_chat_conversation(conversation_id: str):
         """Zwraca szczegóły konwersacji."""
         conversation = chat_manager.get_conversation(conversation_id)
@@ -436,7 +1075,6 @@ def create_web_app(
         return jsonify({"conversation": conversation.to_dict()})
     
     @app.route("/api/chat/start", methods=["POST"])
-    @login_required
     def api_chat_start():
         """Rozpoczyna nową konwersację na podstawie zadania z kolejki."""
         data = request.get_json()
@@ -466,19 +1104,26 @@ def create_web_app(
         
         return jsonify({"conversation": conversation.to_summary()})
     
-    @app.route("/api/chat/message", methods=["POST"])
-    @login_required
-    def api_chat_message():
-        """Dodaje wiadomość do konwersacji i zwraca odpowiedź asystenta."""
-        data = request.get_json()
+    def _prepare_chat_turn(data: Dict):
+        """Zapisuje wiadomość użytkownika i buduje prompt.
+
+        Transkrypcja i analiza trafiają do promptu tylko w pierwszej turze - kolejne
+        wysyłają samo pytanie wraz z kontekstem zwróconym wcześniej przez Ollama,
+        dopóki kontekst mieści się w num_ctx modelu czatu.
+
+        Zwraca krotkę (błąd, conversation_id, user_msg, prompt, model_context, ollama);
+        przy błędzie pierwszy element to gotowa odpowiedź JSON. Analizator czatu
+        ustalany jest raz na turę - ten sam model i num_ctx służą do sprawdzenia
+        kontekstu i do wysłania zapytania.
+        """
         conversation_id = data.get("conversation_id")
         user_message = data.get("message", "")
         
         if not conversation_id:
-            return jsonify({"error": "Brak ID konwersacji"}), 400
+            return (jsonify({"error": "Brak ID konwersacji"}), 400), None, None, None, None, None
         
         if not user_message.strip():
-            return jsonify({"error": "Pusta wiadomość"}), 400
+            return (jsonify({"error": "Pusta wiadomość"}), 400), None, None, None, None, None
         
         # Dodaj wiadomość użytkownika
         user_msg = chat_manager.add_message(
@@ -488,12 +1133,26 @@ def create_web_app(
         )
         
         if not user_msg:
-            return jsonify({"error": "Nie udało się dodać wiadomości"}), 404
+            return (jsonify({"error": "Nie udało się dodać wiadomości"}), 404), None, None, None, None, None
         
         # Pobierz konwersację
         conversation = chat_manager.get_conversation(conversation_id)
         if not conversation:
-            return jsonify({"error": "Konwersacja nie znaleziona"}), 404
+            return (jsonify({"error": "Konwersacja nie znaleziona"}), 404), None, None, None, None, None
+        
+        ollama = _get_ollama_analyzer(chat_mode=True)
+        
+        # Kontynuacja rozmowy - kontekst Ollama jest ważny tylko dla modelu, który go zwrócił
+        if conversation.model_context and conversation.model_context_model == ollama.model:
+            question = _build_chat_question(user_message)
+            if _chat_context_fits(ollama, conversation.model_context, question):
+                return None, conversation_id, user_msg, question, conversation.model_context, ollama
+            # Po przekroczeniu num_ctx Ollama obcięłaby początek kontekstu (transkrypcję) -
+            # zaczynamy od nowa pełnym promptem
+            logger.info(
+                f"Kontekst czatu {conversation_id} zbliża się do num_ctx - ponowne wysłanie transkrypcji"
+            )
+            chat_manager.set_model_context(conversation_id, None, "")
         
         # Przygotuj kontekst dla modelu
         context = {
@@ -506,7 +1165,7 @@ def create_web_app(
             transcription_path = target_output / conversation.transcription_file
             if transcription_path.exists():
                 try:
-                    context["transcription"] = transcription_path.read_text(encoding="utf-8")
+                    context["transcription"] = _read_result_text(transcription_path)
                 except Exception as e:
                     logger.warning(f"Błąd wczytywania transkrypcji: {e}")
         
@@ -514,20 +1173,32 @@ def create_web_app(
             analysis_path = target_output / conversation.analysis_file
             if analysis_path.exists():
                 try:
-                    context["analysis"] = analysis_path.read_text(encoding="utf-8")
+                    context["analysis"] = _read_result_text(analysis_path)
                 except Exception as e:
                     logger.warning(f"Błąd wczytywania analizy: {e}")
         
         # Przygotuj prompt dla modelu
         prompt = _build_chat_prompt(user_message, context)
+        return None, conversation_id, user_msg, prompt, None, ollama
+
+    @app.route("/api/chat/message", methods=["POST"])
+    def api_chat_message():
+        """Dodaje wiadomość do konwersacji i zwraca odpowiedź asystenta."""
+        error, conversation_id, user_msg, prompt, model_context, ollama = _prepare_chat_turn(
+            request.get_json()
+        )
+        if error:
+            return error
         
         # Wywołaj model Ollama z ustawieniami czatu
+        integrity_alert = False
         try:
-            ollama = _get_ollama_analyzer(chat_mode=True)
-            response = ollama.analyze_content(prompt, "custom")
+            response = ollama.analyze_content(prompt, "custom", context=model_context)
+            integrity_alert = bool(response.get("injection_detected"))
             
             if response["success"]:
                 assistant_response = response["raw_response"]
+                chat_manager.set_model_context(conversation_id, response.get("context"), ollama.model)
             else:
                 assistant_response = f"Przepraszam, wystąpił błąd: {response.get('error', 'Nieznany błąd')}"
                 logger.error(f"Błąd Ollama w czacie: {response.get('error', 'Nieznany błąd')}")
@@ -544,28 +1215,85 @@ def create_web_app(
         
         return jsonify({
             "user_message": user_msg.to_dict(),
-            "assistant_message": assistant_msg.to_dict() if assistant_msg else None
+            "assistant_message": assistant_msg.to_dict() if assistant_msg else None,
+            "integrity_alert": integrity_alert,
         })
+
+    @app.route("/api/chat/message/stream", methods=["POST"])
+    def api_chat_message_stream():
+        """Jak /api/chat/message, ale odpowiedź modelu wysyłana jest na bieżąco (SSE).
+
+        Zdarzenia: ``token`` z kolejnymi fragmentami tekstu oraz końcowe ``done``
+        z zapisanymi wiadomościami użytkownika i asystenta.
+        """
+        error, conversation_id, user_msg, prompt, model_context, ollama = _prepare_chat_turn(
+            request.get_json()
+        )
+        if error:
+            return error
+        dumps = app.json.dumps
+
+        def generate():
+            chunks: List[str] = []
+            final_payload: Dict = {}
+            try:
+                for chunk in ollama.stream_content(
+                    prompt, "custom", context=model_context, final_payload=final_payload
+                ):
+                    chunks.append(chunk)
+                    yield f"event: token\ndata: {dumps({'text': chunk})}\n\n"
+                assistant_response = "".join(chunks).strip()
+                chat_manager.set_model_context(conversation_id, final_payload.get("context"), ollama.model)
+            except Exception as e:
+                logger.error(f"Błąd komunikacji z Ollama: {e}")
+                assistant_response = f"Przepraszam, wystąpił błąd podczas komunikacji z modelem: {str(e)}"
+            
+            # Dodaj odpowiedź asystenta po zakończeniu generowania
+            assistant_msg = chat_manager.add_message(
+                conversation_id=conversation_id,
+                role="assistant",
+                content=assistant_response
+            )
+            payload = {
+                "user_message": user_msg.to_dict(),
+                "assistant_message": assistant_msg.to_dict() if assistant_msg else None,
+                "integrity_alert": bool(final_payload.get("injection_detected")),
+            }
+            yield f"event: done\ndata: {dumps(payload)}\n\n"
+
+        response = app.response_class(
+            stream_with_context(generate()), mimetype="text/event-stream"
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        # Wyłącz buforowanie odpowiedzi w reverse proxy (nginx)
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
     
+    def _chat_context_fits(ollama: OllamaAnalyzer, model_context: List[int], question: str) -> bool:
+        """Czy kontekst Ollama, nowe pytanie i odpowiedź zmieszczą się w num_ctx modelu czatu.
+
+        Długość pytania w tokenach szacowana jest zachowawczo (2 znaki na token).
+        """
+        chat_params = ollama.chat_params
+        num_ctx = chat_params.get("num_ctx", 2048)
+        num_predict = max(chat_params.get("num_predict", 512), 0)
+        return len(model_context) + len(question) // 2 + num_predict < num_ctx
+
+    def _build_chat_question(user_message: str) -> str:
+        """Część promptu czatu zmienna w każdej turze."""
+        return "\n\n".join([
+            f"\nPytanie użytkownika: {user_message}",
+            "\nOdpowiedz zwięźle i rzeczowo, bazując na dostarczonym kontekście.",
+        ])
+
     def _build_chat_prompt(user_message: str, context: Dict) -> str:
         """Buduje prompt dla czatu z kontekstem transkrypcji i analizy."""
-        prompt_parts = []
-        
-        prompt_parts.append("Jesteś ekspertem analizującym rozmowy telefoniczne. Odpowiadasz po polsku.")
-        
-        if context.get("filename"):
-            prompt_parts.append(f"Nazwa pliku: {context['filename']}")
-        
-        if context.get("transcription"):
-            prompt_parts.append("\nTranskrypcja rozmowy:\n" + context["transcription"])
-        
-        if context.get("analysis"):
-            prompt_parts.append("\nAnaliza rozmowy:\n" + context["analysis"])
-        
-        prompt_parts.append(f"\nPytanie użytkownika: {user_message}")
-        prompt_parts.append("\nOdpowiedz zwięźle i rzeczowo, bazując na dostarczonym kontekście.")
-        
-        return "\n\n".join(prompt_parts)
+        prefix = _build_chat_prompt_prefix(
+            context.get("filename") or "",
+            context.get("transcription") or "",
+            context.get("analysis") or "",
+        )
+        return "\n\n".join([prefix, _build_chat_question(user_message)])
 
     # ===========================================
     # USTAWIENIA
@@ -581,12 +1309,11 @@ def create_web_app(
         return wrapped
     
     @app.route("/settings/login", methods=["GET", "POST"])
-    @login_required
     def settings_login():
         """Strona logowania do ustawień."""
         if request.method == "POST":
             password = request.form.get("password", "")
-            if password == SETTINGS_PASSWORD:
+            if password == config.SETTINGS_PASSWORD:
                 session["settings_authenticated"] = True
                 flash("Dostęp do ustawień przyznany.", "success")
                 return redirect(request.args.get("next") or url_for("settings"))
@@ -594,7 +1321,6 @@ def create_web_app(
         return render_template("settings_login.html")
     
     @app.route("/settings")
-    @login_required
     @settings_auth_required
     def settings():
         """Strona ustawień aplikacji."""
@@ -607,40 +1333,33 @@ def create_web_app(
         )
 
     @app.route("/settings/save", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_save():
         """Zapisuje ustawienia."""
         settings_manager = get_settings_manager()
         
-        # Pobierz wszystkie ustawienia z formularza
-        new_settings = {}
-        for key in request.form:
-            if key.startswith("setting_"):
-                setting_key = key[8:]  # Usuń prefix "setting_"
-                # Pomiń pola potwierdzenia hasła
-                if setting_key.endswith("_confirm"):
-                    continue
-                new_settings[setting_key] = request.form[key]
+        # Pobierz wszystkie ustawienia z formularza (bez pól potwierdzenia hasła)
+        new_settings = {
+            key[8:]: value
+            for key, value in request.form.items()
+            if key.startswith("setting_") and not key.endswith("_confirm")
+        }
         
-        # Obsługa checkboxów (boolean) - nieobecne = false
-        from .settings_manager import SETTINGS_DEFINITIONS
-        for key, definition in SETTINGS_DEFINITIONS.items():
-            if definition.get("type") == "boolean":
-                if key not in new_settings:
-                    new_settings[key] = "false"
-                elif new_settings[key] in ("on", "1", "true"):
-                    new_settings[key] = "true"
+        # Obsługa checkboxów (boolean) - nieobecne lub niezaznaczone = false
+        for key in _BOOLEAN_SETTING_KEYS:
+            value = new_settings.get(key, "").strip().lower()
+            new_settings[key] = "true" if value in TRUTHY_VALUES else "false"
         
         # Usuń puste hasła (nie zmieniaj jeśli puste)
-        password_keys = [k for k, v in SETTINGS_DEFINITIONS.items() if v.get("type") == "password_change"]
-        for key in password_keys:
-            if key in new_settings and not new_settings[key].strip():
+        for key in _PASSWORD_SETTING_KEYS & new_settings.keys():
+            if not new_settings[key].strip():
                 del new_settings[key]
         
         success, message = settings_manager.save_settings(new_settings)
         
         if success:
+            get_cached_settings().reload()
+            _invalidate_ollama_analyzers()
             flash(message, "success")
         else:
             flash(message, "error")
@@ -656,18 +1375,13 @@ def create_web_app(
     # ===========================================
     
     @app.route("/settings/prompts")
-    @login_required
     @settings_auth_required
     def settings_prompts():
         """Zarządzanie promptami analizy."""
         prompt_manager = get_prompt_manager()
         prompts = prompt_manager.get_prompts_content()
         
-        # Wczytaj system prompt
-        system_prompt_file = PROMPT_DIR / "system_prompt.txt"
-        system_prompt = ""
-        if system_prompt_file.exists():
-            system_prompt = system_prompt_file.read_text(encoding="utf-8")
+        system_prompt = _read_prompt_file(SYSTEM_PROMPT_FILE)
         
         return render_template(
             "settings_prompts.html",
@@ -677,15 +1391,15 @@ def create_web_app(
         )
     
     @app.route("/settings/prompts/system", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_system_prompt_save():
         """Zapisuje system prompt."""
         content = request.form.get("content", "")
         
-        system_prompt_file = PROMPT_DIR / "system_prompt.txt"
+        system_prompt_file = SYSTEM_PROMPT_FILE
         try:
-            system_prompt_file.write_text(content, encoding="utf-8")
+            _write_text_atomic(system_prompt_file, content)
+            _read_text_cached.cache_clear()
             flash("System Prompt zapisany pomyślnie.", "success")
             logger.info(f"System prompt zapisany ({len(content)} znaków)")
         except Exception as e:
@@ -695,7 +1409,6 @@ def create_web_app(
         return redirect(url_for("settings_prompts"))
 
     @app.route("/settings/prompts/save", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_prompts_save():
         """Zapisuje pojedynczy prompt."""
@@ -725,7 +1438,6 @@ def create_web_app(
         return redirect(url_for("settings_prompts"))
 
     @app.route("/settings/prompts/new", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_prompts_new():
         """Tworzy nowy prompt."""
@@ -762,7 +1474,6 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         return redirect(url_for("settings_prompts"))
 
     @app.route("/settings/prompts/delete/<int:prompt_number>", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_prompts_delete(prompt_number: int):
         """Usuwa prompt."""
@@ -780,26 +1491,24 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
     # ===========================================
     
     @app.route("/settings/prompt-status")
-    @login_required
     @settings_auth_required
     def settings_prompt_status():
         """Ustawienia promptu statusu."""
         # Wczytaj istniejący prompt statusu
-        status_prompt_file = PROMPT_DIR / "status_prompt.txt"
+        status_prompt_file = STATUS_PROMPT_FILE
         requirement = ""
         statuses = ""
         instruction = ""
         
-        if status_prompt_file.exists():
-            try:
-                content = status_prompt_file.read_text(encoding="utf-8")
-                # Parsuj zawartość na sekcje
-                sections = parse_status_prompt_content(content)
-                requirement = sections.get("requirement", "")
-                statuses = sections.get("statuses", "")
-                instruction = sections.get("instruction", "")
-            except Exception as e:
-                logger.error(f"Błąd wczytywania promptu statusu: {e}")
+        try:
+            content = _read_prompt_file(status_prompt_file)
+            # Parsuj zawartość na sekcje
+            sections = parse_status_prompt_content(content)
+            requirement = sections.get("requirement", "")
+            statuses = sections.get("statuses", "")
+            instruction = sections.get("instruction", "")
+        except Exception as e:
+            logger.error(f"Błąd wczytywania promptu statusu: {e}")
         
         return render_template(
             "settings_prompt_status.html",
@@ -810,7 +1519,6 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         )
     
     @app.route("/settings/prompt-status/save", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_status_prompt_save():
         """Zapisuje prompt statusu."""
@@ -827,9 +1535,10 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         content = build_status_prompt_content(requirement, statuses, instruction)
         
         # Zapisz do pliku
-        status_prompt_file = PROMPT_DIR / "status_prompt.txt"
+        status_prompt_file = STATUS_PROMPT_FILE
         try:
-            status_prompt_file.write_text(content, encoding="utf-8")
+            _write_text_atomic(status_prompt_file, content)
+            _read_text_cached.cache_clear()
             flash("Prompt statusu zapisany pomyślnie.", "success")
             logger.info(f"Prompt statusu zapisany ({len(content)} znaków)")
         except Exception as e:
@@ -842,14 +1551,9 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         """Parsuje zawartość promptu statusu na sekcje."""
         sections = {"requirement": "", "statuses": "", "instruction": ""}
         
-        # Podziel na sekcje
-        parts = content.split("\n\n===\n\n")
-        if len(parts) >= 1:
-            sections["requirement"] = parts[0]
-        if len(parts) >= 2:
-            sections["statuses"] = parts[1]
-        if len(parts) >= 3:
-            sections["instruction"] = parts[2]
+        # Podziel na (co najwyżej) trzy sekcje - separator w ostatniej sekcji zostaje w jej treści
+        parts = content.split("\n\n===\n\n", 2)
+        sections.update(zip(("requirement", "statuses", "instruction"), parts))
         
         return sections
     
@@ -866,15 +1570,64 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
     # TEST AUDIO PREPROCESSING
     # ===========================================
     
+    # Zlecone przetwarzania audio testowego: id -> (future, czas zlecenia)
+    test_audio_tasks: Dict[str, tuple] = {}
+
+    def _test_audio_options() -> Optional[Dict[str, object]]:
+        """Parametry AudioPreprocessor z ustawień albo None, gdy preprocessing jest wyłączony."""
+        # Wszystkie ustawienia jednym odczytem .env
+        values = get_settings_manager().get_settings([
+            "AUDIO_PREPROCESS_ENABLED",
+            "AUDIO_PREPROCESS_NOISE_REDUCE",
+            "AUDIO_PREPROCESS_NOISE_STRENGTH",
+            "AUDIO_PREPROCESS_NORMALIZE",
+            "AUDIO_PREPROCESS_GAIN_DB",
+            "AUDIO_PREPROCESS_COMPRESSOR",
+            "AUDIO_PREPROCESS_COMP_THRESHOLD",
+            "AUDIO_PREPROCESS_COMP_RATIO",
+            "AUDIO_PREPROCESS_SPEAKER_LEVELING",
+            "AUDIO_PREPROCESS_EQ",
+            "AUDIO_PREPROCESS_HIGHPASS",
+        ])
+
+        def _bool(key: str, default: str) -> bool:
+            return (values[key] or default).strip().lower() in TRUTHY_VALUES
+
+        def _float(key: str, default: str) -> float:
+            return float(values[key] or default)
+
+        if not _bool("AUDIO_PREPROCESS_ENABLED", "false"):
+            return None
+        
+        return dict(
+            noise_reduce=_bool("AUDIO_PREPROCESS_NOISE_REDUCE", "true"),
+            noise_strength=_float("AUDIO_PREPROCESS_NOISE_STRENGTH", "0.75"),
+            normalize=_bool("AUDIO_PREPROCESS_NORMALIZE", "true"),
+            gain_db=_float("AUDIO_PREPROCESS_GAIN_DB", "1.5"),
+            compressor=_bool("AUDIO_PREPROCESS_COMPRESSOR", "true"),
+            comp_threshold=_float("AUDIO_PREPROCESS_COMP_THRESHOLD", "-20.0"),
+            comp_ratio=_float("AUDIO_PREPROCESS_COMP_RATIO", "4.0"),
+            speaker_leveling=_bool("AUDIO_PREPROCESS_SPEAKER_LEVELING", "true"),
+            eq=_bool("AUDIO_PREPROCESS_EQ", "true"),
+            highpass=int(values["AUDIO_PREPROCESS_HIGHPASS"] or "100"),
+        )
+
+    def _test_audio_result(file_id: str, duration_ms: int, preprocessed: bool) -> Dict[str, object]:
+        return {
+            "success": True,
+            "status": "done",
+            "file_id": file_id,
+            "duration_ms": duration_ms,
+            "preprocessed": preprocessed,
+        }
+
     @app.route("/settings/test-audio", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_test_audio():
-        """Przetwarza plik audio zgodnie z ustawieniami preprocessora (max 30s)."""
-        from pydub import AudioSegment
-        import tempfile
-        import uuid
-        
+        """Zleca przycięcie pliku audio (max 30s) i preprocessing zgodnie z ustawieniami.
+
+        Odpowiedź 202 z ``task_id`` - stan sprawdza /settings/test-audio/status/<task_id>.
+        """
         if "audio_file" not in request.files:
             return jsonify({"error": "Brak pliku audio"}), 400
         
@@ -882,129 +1635,114 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         if not file.filename:
             return jsonify({"error": "Nie wybrano pliku"}), 400
         
+        # Zapomnij zakończone zlecenia, których pliki usunął już janitor
+        cutoff = time.monotonic() - TEST_AUDIO_MAX_AGE
+        for task_id, (future, created) in list(test_audio_tasks.items()):
+            if created < cutoff and future.done():
+                test_audio_tasks.pop(task_id, None)
+        
+        temp_id = f"{_TEST_AUDIO_ID_PREFIX}{next(_test_audio_counter):x}"
+        original_ext = os.path.splitext(secure_filename(file.filename))[1].lower()
+        source_path = TEST_AUDIO_DIR / f"source_{temp_id}{original_ext}"
         try:
-            # Zapisz tymczasowo oryginalny plik
-            temp_dir = Path(tempfile.gettempdir()) / "whisper_test"
-            temp_dir.mkdir(exist_ok=True)
-            
-            original_ext = Path(file.filename).suffix.lower()
-            temp_id = str(uuid.uuid4())[:8]
-            original_path = temp_dir / f"original_{temp_id}{original_ext}"
-            file.save(str(original_path))
-            
-            # Wczytaj i przytnij do 30 sekund
-            audio = AudioSegment.from_file(str(original_path))
-            max_duration_ms = 30 * 1000  # 30 sekund
-            if len(audio) > max_duration_ms:
-                audio = audio[:max_duration_ms]
-                logger.info(f"Audio przycięte do 30 sekund")
-            
-            # Zapisz przycięty plik jako WAV (do przetwarzania)
-            trimmed_path = temp_dir / f"trimmed_{temp_id}.wav"
-            audio.export(str(trimmed_path), format="wav")
-            
-            # Zastosuj preprocessing jeśli włączony
-            settings_mgr = get_settings_manager()
-            preprocess_enabled = settings_mgr.get_setting("AUDIO_PREPROCESS_ENABLED")
-            
-            if preprocess_enabled and preprocess_enabled.lower() == "true":
-                from .audio_preprocessor import AudioPreprocessor
-                
-                # Pobierz wszystkie ustawienia preprocessora
-                noise_reduce = settings_mgr.get_setting("AUDIO_PREPROCESS_NOISE_REDUCE") or "true"
-                noise_strength = float(settings_mgr.get_setting("AUDIO_PREPROCESS_NOISE_STRENGTH") or "0.75")
-                normalize = settings_mgr.get_setting("AUDIO_PREPROCESS_NORMALIZE") or "true"
-                gain_db = float(settings_mgr.get_setting("AUDIO_PREPROCESS_GAIN_DB") or "1.5")
-                compressor = settings_mgr.get_setting("AUDIO_PREPROCESS_COMPRESSOR") or "true"
-                comp_threshold = float(settings_mgr.get_setting("AUDIO_PREPROCESS_COMP_THRESHOLD") or "-20.0")
-                comp_ratio = float(settings_mgr.get_setting("AUDIO_PREPROCESS_COMP_RATIO") or "4.0")
-                speaker_leveling = settings_mgr.get_setting("AUDIO_PREPROCESS_SPEAKER_LEVELING") or "true"
-                eq = settings_mgr.get_setting("AUDIO_PREPROCESS_EQ") or "true"
-                highpass = int(settings_mgr.get_setting("AUDIO_PREPROCESS_HIGHPASS") or "100")
-                
-                preprocessor = AudioPreprocessor(
-                    noise_reduce=noise_reduce.lower() == "true",
-                    noise_strength=noise_strength,
-                    normalize=normalize.lower() == "true",
-                    gain_db=gain_db,
-                    compressor=compressor.lower() == "true",
-                    comp_threshold=comp_threshold,
-                    comp_ratio=comp_ratio,
-                    speaker_leveling=speaker_leveling.lower() == "true",
-                    eq=eq.lower() == "true",
-                    highpass=highpass,
-                )
-                
-                processed_path = temp_dir / f"processed_{temp_id}.wav"
-                preprocessor.process(trimmed_path, processed_path)
-                result_path = processed_path
-                logger.info(f"Audio przetworzone przez preprocessor")
+            # Upload jest już na dysku (plik .part) - przenosimy go zamiast kopiować;
+            # zapis strumienia tylko gdy nie ma on ścieżki
+            part_name = getattr(file.stream, "name", None)
+            if isinstance(part_name, str) and os.path.isfile(part_name):
+                file.stream.close()
+                shutil.move(part_name, source_path)
             else:
-                result_path = trimmed_path
-                logger.info(f"Preprocessing wyłączony, zwracam oryginał")
+                file.save(source_path)
             
-            # Usuń oryginalny plik
-            original_path.unlink(missing_ok=True)
-            if result_path != trimmed_path:
-                trimmed_path.unlink(missing_ok=True)
+            options = _test_audio_options()
+            if options is None:
+                logger.info("Preprocessing wyłączony, zwracam oryginał")
             
-            # Zwróć URL do pobrania
-            return jsonify({
-                "success": True,
-                "file_id": temp_id,
-                "duration_ms": len(audio),
-                "preprocessed": preprocess_enabled and preprocess_enabled.lower() == "true",
-            })
+            # Dekodowanie (ffmpeg) i preprocessing poza wątkiem żądania
+            future = _test_audio_executor.submit(_run_test_audio_job, source_path, temp_id, options)
+            test_audio_tasks[temp_id] = (future, time.monotonic())
+            return jsonify({"task_id": temp_id, "status": "pending"}), 202
             
         except Exception as e:
+            source_path.unlink(missing_ok=True)
             logger.error(f"Błąd przetwarzania audio testowego: {e}")
             return jsonify({"error": str(e)}), 500
+
+    @app.route("/settings/test-audio/status/<task_id>")
+    @settings_auth_required
+    def settings_test_audio_status(task_id: str):
+        """Stan zleconego przetwarzania audio testowego."""
+        task = test_audio_tasks.get(task_id)
+        if task is None:
+            return jsonify({"error": "Nieznane zadanie"}), 404
+        
+        future, _ = task
+        if not future.done():
+            return jsonify({"task_id": task_id, "status": "pending"})
+        
+        test_audio_tasks.pop(task_id, None)
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Błąd przetwarzania audio testowego: {error}")
+            return jsonify({"status": "error", "error": str(error)}), 500
+        
+        duration_ms, preprocessed = future.result()
+        if preprocessed:
+            logger.info("Audio przetworzone przez preprocessor")
+        return jsonify(_test_audio_result(task_id, duration_ms, preprocessed))
     
     @app.route("/settings/test-audio/<file_id>")
-    @login_required
+    @settings_auth_required
     def settings_test_audio_download(file_id):
         """Pobiera przetworzony plik audio testowy."""
-        import tempfile
-        
-        temp_dir = Path(tempfile.gettempdir()) / "whisper_test"
-        
         # Szukaj pliku processed lub trimmed
-        processed_path = temp_dir / f"processed_{file_id}.wav"
-        trimmed_path = temp_dir / f"trimmed_{file_id}.wav"
-        
-        if processed_path.exists():
-            return send_from_directory(str(temp_dir), f"processed_{file_id}.wav", 
-                                       mimetype="audio/wav",
-                                       as_attachment=False)
-        elif trimmed_path.exists():
-            return send_from_directory(str(temp_dir), f"trimmed_{file_id}.wav",
-                                       mimetype="audio/wav",
-                                       as_attachment=False)
+        for file_name in (f"processed_{file_id}.wav", f"trimmed_{file_id}.wav"):
+            if (TEST_AUDIO_DIR / file_name).is_file():
+                break
         else:
             abort(404)
+        
+        # Pełne pobranie (bez Range) przez klienta obsługującego gzip dostaje skompresowaną
+        # kopię - PCM z mową dobrze się kompresuje; odtwarzacz (żądania Range) dostaje WAV
+        gzip_requested = (
+            "gzip" in request.headers.get("Accept-Encoding", "")
+            and "Range" not in request.headers
+        )
+        if gzip_requested:
+            file_name = _ensure_gzip_copy(TEST_AUDIO_DIR / file_name).name
+        
+        # Plik o danym id nie zmienia się do czasu usunięcia - przeglądarka może go
+        # trzymać w cache; ETag/Range obsługują odtwarzacz przy przewijaniu. Treść idzie
+        # przez wsgi.file_wrapper (sendfile) lub X-Sendfile, bez czytania pliku w Pythonie
+        response = send_from_directory(
+            TEST_AUDIO_DIR,
+            file_name,
+            mimetype="audio/wav",
+            as_attachment=False,
+            conditional=True,
+            etag=True,
+            max_age=int(TEST_AUDIO_MAX_AGE),
+        )
+        if gzip_requested:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = f"private, max-age={int(TEST_AUDIO_MAX_AGE)}"
+        return response
 
     # ===========================================
     # PRZEŁADOWANIE USTAWIEŃ
     # ===========================================
     
     @app.route("/settings/reload", methods=["POST"])
-    @login_required
     @settings_auth_required
     def settings_reload():
         """Przeładowuje ustawienia z pliku .env bez restartu aplikacji."""
         try:
-            # Przeładuj moduł config
-            import importlib
-            from . import config
-            
-            # Przeładuj .env do środowiska
-            from dotenv import load_dotenv
-            project_dir = Path(__file__).parent.parent
-            env_path = project_dir / ".env"
-            load_dotenv(env_path, override=True)
-            
-            # Przeładuj moduł config
-            importlib.reload(config)
+            config.reload()
+            # Odśwież cache zależne od ustawień (panel, analizatory i lista modeli Ollama)
+            get_cached_settings().reload()
+            _invalidate_ollama_analyzers()
+            invalidate_ollama_models_cache()
             
             logger.info("Przeładowano ustawienia z pliku .env")
             flash("Ustawienia zostały przeładowane.", "success")
@@ -1014,9 +1752,13 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
         
         return redirect(url_for("settings"))
 
+    # Kompilacja szablonów przy starcie - pierwsze żądanie nie płaci za parsowanie Jinja
+    for template_name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(template_name)
+
     logger.info(
         "Interfejs webowy gotowy. Logowanie: %s / %s. Host: %s:%s",
-        WEB_LOGIN,
+        config.WEB_LOGIN,
         "***",
         WEB_HOST,
         WEB_PORT,
@@ -1027,7 +1769,7 @@ Odpowiedz w formacie JSON. Wszystkie teksty w odpowiedzi muszą być w języku p
 
 def check_restart_requested() -> bool:
     """Sprawdza czy restart był żądany."""
-    return _restart_requested
+    return _restart_event.is_set()
 
 
 __all__ = ["create_web_app", "check_restart_requested"]
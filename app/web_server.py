@@ -33,7 +33,6 @@ torch.serialization.load = _patched_torch_load
 
 import logging
 
-from .audio_processor import AudioProcessor
 from .colored_logging import setup_colored_logging
 from .config import (
     ENABLE_OLLAMA_ANALYSIS,
@@ -52,8 +51,12 @@ from .web_interface import create_web_app
 logger = logging.getLogger(__name__)
 
 
-def main():
+def create_app():
+    """Buduje aplikację Flask wraz z modelami i kolejką (fabryka dla gunicorn)."""
     setup_colored_logging(level=LOG_LEVEL, log_file=str(LOG_FILE))
+    # Whisper/pyannote ładowane dopiero przy budowaniu aplikacji, po konfiguracji logowania
+    from .audio_processor import AudioProcessor
+
     queue = ProcessingQueue()
     processor = AudioProcessor(
         enable_speaker_diarization=ENABLE_SPEAKER_DIARIZATION,
@@ -66,7 +69,7 @@ def main():
         ollama_model=OLLAMA_MODEL,
     )
 
-    flask_app = create_web_app(
+    return create_web_app(
         processor=processor,
         processing_queue=queue,
         input_folder=processor.file_loader.input_folder,
@@ -74,10 +77,13 @@ def main():
         asynchronous=True,
     )
 
+
+def main():
+    flask_app = create_app()
+
     logger.info("Uruchamiam serwer Flask na %s:%s", WEB_HOST, WEB_PORT)
     flask_app.run(host=WEB_HOST, port=WEB_PORT, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
     main()
-
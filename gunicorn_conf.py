@@ -0,0 +1,26 @@
+"""
+Konfiguracja gunicorn dla interfejsu webowego.
+
+Uruchomienie:
+    gunicorn -c gunicorn_conf.py "app.web_server:create_app()"
+
+Modele (Whisper, pyannote) oraz kolejka przetwarzania żyją w pamięci procesu,
+dlatego używany jest jeden proces roboczy z pulą wątków (gthread). Wątki
+obsługują blokujące I/O (uploady, pobrania, zapytania do Ollama) równolegle,
+a przetwarzanie audio działa w osobnej puli wątków aplikacji. Workery gevent
+nie są używane - monkey-patching zamieniłby wątki przetwarzania na greenlety
+i obliczenia Whisper blokowałyby obsługę żądań.
+"""
+from app.config import WEB_HOST, WEB_PORT, WEB_SERVER_THREADS
+
+bind = f"{WEB_HOST}:{WEB_PORT}"
+workers = 1
+worker_class = "gthread"
+# Bez preload: fabryka ładuje modele (CUDA) i uruchamia wątki (pule, janitor),
+# które nie przetrwałyby fork() procesu roboczego
+preload_app = False
+threads = WEB_SERVER_THREADS
+keepalive = 5
+# Przesyłanie dużych plików audio i długie odpowiedzi czatu
+timeout = 600
+graceful_timeout = 30
@@ -44,5 +44,8 @@ if [[ "${SKIP_APP_EXECUTION}" == "1" ]]; then
 fi
 
 echo "Starting Whisper Analyzer Web Server (Flask + Backend)..."
+if [[ "${WEB_SERVER:-flask}" == "gunicorn" ]]; then
+  exec gunicorn -c "${PROJECT_ROOT}/gunicorn_conf.py" "app.web_server:create_app()"
+fi
 python -m app.web_server
 